@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from constants import MEET_RANKING
+from events import is_teen_event, meet_levels
+
+# Largest number of (scenario, best time) comparisons held in memory at once
+ATTENDANCE_BATCH_CELLS = 5000000
+
+
+# Every athlete's best time in every event they swam, grouped by season and team, so the meet each
+# athlete qualifies for under any gold/silver standards is a few array operations away.
+# The athlete x event best times are stored sparsely: one row per (season, athlete, event), sorted
+# so each athlete's events are contiguous. An athlete swims at the highest meet any of their events
+# qualifies for, so per-event counts alone would count athletes who qualify in several events more
+# than once; instead each candidate's level is computed per best time and reduced per athlete, and
+# the athletes of each (season, team) are counted with one bincount.
+class TeamAttendanceIndex:
+    def __init__(self, events, groups, event_rows, best, athlete_starts, athlete_groups):
+        self.events = pd.Index(events)
+        self.groups = groups
+        self.event_rows = event_rows
+        self.best = best
+        self.athlete_starts = athlete_starts
+        self.athlete_groups = athlete_groups
+        self.teen = is_teen_event(pd.Series(self.events)).to_numpy()[event_rows]
+
+    # Build the index from results with 'season', 'team_abbr', 'athlete_id', 'Event_name' and
+    # 'converted_hundredths' columns
+    @classmethod
+    def from_results(cls, df):
+        best = (df.groupby(['season', 'athlete_id', 'Event_name'], observed=True)
+                  .agg(best=('converted_hundredths', 'min'), team_abbr=('team_abbr', 'first'))
+                  .reset_index())
+        event_rows, events = pd.factorize(best['Event_name'].astype(str), sort=True)
+
+        athlete_rows = best.groupby(['season', 'athlete_id'], sort=False).ngroup().to_numpy()
+        athlete_starts = np.flatnonzero(np.diff(athlete_rows, prepend=-1))
+        athletes = best.iloc[athlete_starts]
+        group_codes, groups = pd.MultiIndex.from_frame(athletes[['season', 'team_abbr']].astype({'team_abbr': str})).factorize(sort=True)
+        groups = pd.MultiIndex.from_tuples(groups, names=['season', 'team_abbr'])
+        return cls(events, groups, event_rows, best['best'].to_numpy(dtype='float64'), athlete_starts, group_codes)
+
+    # Function to count each (season, team)'s athletes at each meet under one or more candidate
+    # standards. gold and silver hold each index event's standard in hundredths (NaN where an event
+    # has no standard), shaped (events,) or (scenarios, events).
+    # Returns counts shaped (scenarios, groups, 3) in MEET_RANKING order.
+    def counts(self, gold, silver):
+        gold, silver = np.atleast_2d(gold), np.atleast_2d(silver)
+        batch = max(1, ATTENDANCE_BATCH_CELLS // max(len(self.best), 1))
+        counts = []
+        for start in range(0, len(gold), batch):
+            row_gold = gold[start:start + batch, self.event_rows]
+            row_silver = silver[start:start + batch, self.event_rows]
+            # rank of each best time: 0 gold, 1 silver, 2 bronze, 3 for events without standards
+            rank = np.where(np.isnan(row_gold) | np.isnan(row_silver), 3, meet_levels(self.best, row_gold, row_silver, self.teen)).astype('int64')
+            levels = np.minimum.reduceat(rank, self.athlete_starts, axis=1) if len(self.best) else rank
+            cells = (np.arange(len(levels))[:, None] * len(self.groups) + self.athlete_groups) * 4 + levels
+            counts.append(np.bincount(cells.ravel(), minlength=len(levels) * len(self.groups) * 4)
+                          .reshape(len(levels), len(self.groups), 4)[:, :, :3])
+        return np.concatenate(counts) if counts else np.zeros((0, len(self.groups), 3), dtype='int64')
+
+    # Function to return the team attendance under one StandardsTable (the yard gold and silver times):
+    # indexed by (season, team_abbr), one column per meet and a 'Total' column, without teams that had
+    # nobody at any meet
+    def attendance(self, standards):
+        counts = self.counts(standards.times(self.events, 'gold_y'), standards.times(self.events, 'silver_y'))[0]
+        summary = pd.DataFrame(counts, index=self.groups,
+                               columns=pd.CategoricalIndex(MEET_RANKING, categories=MEET_RANKING, ordered=True, name='qualified_meet'))
+        summary['Total'] = summary.sum(axis=1)
+        return summary[summary['Total'] > 0]
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from constants import CACHE_DIR, DEFAULT_GOLD_PERCENTILE, DEFAULT_SILVER_PERCENTILE, DEFAULT_HEAT_TIME_SECONDS, DEFAULT_EVENT_TIME_SECONDS
+from synthetic_data import write_league
+from ingest_cache import load_results
+from percentiles import get_proposed_standards
+from events import classify_meet
+from meet_duration import dedup_entries, get_estimated_meet_duration
+from close_to_pin import run_batch as run_close_to_pin_batch
+from standards import StandardsTable, load_current_standards
+
+
+# Function to time one stage: runs func repeat times and keeps the fastest run.
+# rows is a function of the stage's result giving the number of rows it produced.
+def time_stage(results, name, func, repeat, rows=len):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - start)
+    results.append({'stage': name, 'best_seconds': min(timings), 'median_seconds': float(np.median(timings)), 'rows': int(rows(output))})
+    print(f'{name:<20} {min(timings):>9.3f}s  {rows(output):>10} rows')
+    return output
+
+
+# Function to benchmark every stage of the standards and close to pin pipelines on the data set in
+# data_dir (gasl*.csv, current_standards.csv and best_times/*.csv). Returns one row per stage.
+def run_benchmark(data_dir, repeat=3, gold_pct=DEFAULT_GOLD_PERCENTILE, silver_pct=DEFAULT_SILVER_PERCENTILE):
+    results = []
+    os.chdir(data_dir)
+
+    def ingest_cold():
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return load_results('./gasl*.csv')
+
+    time_stage(results, 'ingest (cold cache)', ingest_cold, repeat)
+    df = time_stage(results, 'ingest (warm cache)', lambda: load_results('./gasl*.csv'), repeat)
+    current_standards = load_current_standards()
+
+    combined, _ = time_stage(results, 'percentile summary',
+                             lambda: get_proposed_standards(df, current_standards, gold_pct, silver_pct),
+                             repeat, rows=lambda output: len(output[0]))
+    proposed_standards = StandardsTable.from_proposed(combined)
+
+    season = int(df['season'].max())
+    season_df = df[df['season'] == season]
+
+    def classify():
+        swims = season_df[proposed_standards.contains(season_df['Event_name'])].reset_index(drop=True)
+        return swims.assign(qualified_meet=classify_meet(swims['converted_hundredths'],
+            proposed_standards.times(swims['Event_name'], 'gold_y'), proposed_standards.times(swims['Event_name'], 'silver_y'), swims['Event_name']))
+
+    entries = time_stage(results, 'classification', classify, repeat)
+    deduped = time_stage(results, 'dedup', lambda: dedup_entries(entries.copy()), repeat)
+    time_stage(results, 'duration estimate',
+               lambda: get_estimated_meet_duration(deduped, season, proposed_standards, DEFAULT_HEAT_TIME_SECONDS, DEFAULT_EVENT_TIME_SECONDS),
+               repeat)
+
+    report_dir = tempfile.mkdtemp(prefix='close_to_pin_')
+    time_stage(results, 'close to pin (batch)',
+               lambda: run_close_to_pin_batch('./best_times/*.csv', report_dir, index_path=None, workers=1),
+               repeat, rows=lambda output: sum(team_rows for _, team_rows, _ in output))
+    shutil.rmtree(report_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(__file__, description="Time each pipeline stage on a synthetic league")
+
+    parser.add_argument("--data-dir", default=None, help="Existing data set from synthetic_data.py (default: generate one in a temporary directory)")
+    parser.add_argument("--teams", type=int, default=30, help="Number of teams to generate")
+    parser.add_argument("--seasons", type=int, default=3, help="Number of seasons to generate")
+    parser.add_argument("--swimmers", type=int, default=150, help="Swimmers per team to generate")
+    parser.add_argument("--events", type=int, default=4, help="Events each generated swimmer swims")
+    parser.add_argument("--meets", type=int, default=7, help="Meets per generated season")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--output", default='benchmark_results.json', help="JSON report (default: benchmark_results.json)")
+
+    options = parser.parse_args()
+    output_file = os.path.abspath(options.output)
+
+    data_dir = options.data_dir or tempfile.mkdtemp(prefix='gasl_benchmark_')
+    if options.data_dir is None:
+        rows = write_league(data_dir, options.teams, options.seasons, options.swimmers, options.events, options.meets, options.seed)
+        print(f'Generated {rows} results in {data_dir}')
+
+    stages = run_benchmark(data_dir, options.repeat)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'parameters': {key: value for key, value in vars(options).items() if key != 'output'},
+        'stages': stages,
+    }
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Benchmark written to: {output_file}')
+
+    if options.data_dir is None:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+# Main execution
+if __name__ == "__main__":
+    main()
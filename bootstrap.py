@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from constants import METERS_FACTOR
+from events import gasl_event_ids, is_teen_event
+from percentiles import EVENT_COLUMNS, sort_event_times, event_quantiles
+from utils import convert_hundredths_to_times
+
+DEFAULT_REPLICATES = 2000
+DEFAULT_CONFIDENCE = 0.95
+
+# Largest number of bootstrap weights held in memory at once (replicates x swims of one event)
+BOOTSTRAP_BATCH_WEIGHTS = 5000000
+
+
+# Linearly interpolated quantiles (as numpy.quantile) of weighted samples: row r of weights gives how
+# many times each of the sorted values was drawn in replicate r. Returns an array shaped (replicates, pcts).
+def weighted_quantiles(sorted_values, weights, pcts):
+    cumulative = np.cumsum(weights, axis=1)
+    totals = cumulative[:, -1:]
+    # banding the rows makes all of them one increasing array, so one searchsorted reads every rank
+    band = int(totals.max()) + 1
+    rows = np.arange(len(weights))[:, None]
+    keys = (cumulative + rows * band).ravel()
+
+    def value_at_rank(ranks):
+        positions = np.searchsorted(keys, (rows * band + ranks).ravel(), side='right').reshape(ranks.shape)
+        return sorted_values[positions - rows * weights.shape[1]]
+
+    position = np.asarray(pcts, dtype='float64')[None, :] * (totals - 1)
+    below = np.floor(position).astype('int64')
+    above = np.minimum(below + 1, totals - 1)
+    fraction = position - below
+    low, high = value_at_rank(below), value_at_rank(above)
+    difference = high - low
+    return np.where(fraction >= 0.5, high - difference * (1 - fraction), low + difference * fraction)
+
+
+# Event slices shared by every bootstrap task in a worker process, set once per worker
+_bootstrap_data = {}
+
+def _init_bootstrap_worker(sorted_values, starts, counts, athletes):
+    _bootstrap_data['sorted_values'] = sorted_values
+    _bootstrap_data['starts'] = starts
+    _bootstrap_data['counts'] = counts
+    _bootstrap_data['athletes'] = athletes
+
+
+# Function to bootstrap the quantiles of a block of events. Each replicate redraws an event's swims
+# (or, with athletes, its athletes together with all their swims) with replacement; the draws are
+# turned into multinomial weights over the sorted times, so a batch of replicates is a few array
+# operations. Returns, for every event, the lower and upper band and the standard error of each pct,
+# shaped (events, pcts, 3).
+def bootstrap_events(event_rows, pcts, replicates, confidence, seeds):
+    sorted_values = _bootstrap_data['sorted_values']
+    athletes = _bootstrap_data['athletes']
+    tail = (1 - confidence) / 2 * 100
+    bands = np.empty((len(event_rows), len(pcts), 3))
+
+    for position, (row, seed) in enumerate(zip(event_rows, seeds)):
+        start, count = _bootstrap_data['starts'][row], _bootstrap_data['counts'][row]
+        values = sorted_values[start:start + count]
+        # the units drawn: each swim, or each athlete with the swims that belong to them
+        if athletes is None:
+            units, swim_units = count, None
+        else:
+            swim_units, unit_keys = pd.factorize(athletes[start:start + count])
+            units = len(unit_keys)
+
+        rng = np.random.default_rng(seed)
+        batch = max(1, BOOTSTRAP_BATCH_WEIGHTS // max(count, units))
+        estimates = []
+        for done in range(0, replicates, batch):
+            size = min(batch, replicates - done)
+            draws = rng.integers(0, units, (size, units))
+            weights = np.bincount((np.arange(size)[:, None] * units + draws).ravel(), minlength=size * units).reshape(size, units)
+            if swim_units is not None:
+                weights = weights[:, swim_units]
+            estimates.append(weighted_quantiles(values, weights, pcts))
+        estimates = np.concatenate(estimates)
+
+        bands[position, :, 0] = np.percentile(estimates, tail, axis=0)
+        bands[position, :, 1] = np.percentile(estimates, 100 - tail, axis=0)
+        bands[position, :, 2] = estimates.std(axis=0)
+    return bands
+
+
+# Function to compute bootstrap confidence bands for the proposed gold and silver standards of every
+# event. by='swim' resamples each event's swims; by='athlete' resamples each event's athletes (a
+# season's swimmer) with all their swims, which allows for swimmers who swam an event many times.
+# Events are bootstrapped in blocks on a process pool; every event has its own random stream, so
+# the results do not depend on the number of workers.
+# Returns one row per event with the point estimate and the band of each yard and meter standard.
+def get_bootstrap_summary(df, gold_pct, silver_pct, replicates=DEFAULT_REPLICATES, confidence=DEFAULT_CONFIDENCE,
+                          by='swim', workers=None, seed=1):
+    if by not in ('swim', 'athlete'):
+        raise ValueError(f"Unknown bootstrap unit: {by}")
+    events, sorted_values = sort_event_times(df)
+    pcts = [gold_pct, silver_pct]
+    estimates = event_quantiles(events, sorted_values, pcts)
+
+    athletes = None
+    if by == 'athlete':
+        # the same order sort_event_times sorts the times in
+        codes = df.groupby(EVENT_COLUMNS, observed=True).ngroup().to_numpy()
+        order = np.lexsort((df['converted_hundredths'].to_numpy(dtype='float64'), codes))
+        athlete_keys = ['season', 'athlete_id'] if 'season' in df else ['athlete_id']
+        athletes = df[athlete_keys].groupby(athlete_keys, sort=False).ngroup().to_numpy()[order]
+
+    starts, counts = events['start'].to_numpy(), events['count'].to_numpy()
+    seeds = np.random.SeedSequence(seed).spawn(len(events))
+    # blocks of similar total size, largest events first so no worker is left with the big ones at the end
+    by_size = np.argsort(-counts, kind='stable')
+    workers = max(1, min(len(events), workers or os.cpu_count() or 1))
+    blocks = [by_size[worker::workers] for worker in range(workers)]
+
+    if workers <= 1:
+        _init_bootstrap_worker(sorted_values, starts, counts, athletes)
+        results = [bootstrap_events(block, pcts, replicates, confidence, [seeds[row] for row in block]) for block in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bootstrap_worker,
+                                 initargs=(sorted_values, starts, counts, athletes)) as executor:
+            futures = [executor.submit(bootstrap_events, block, pcts, replicates, confidence, [seeds[row] for row in block]) for block in blocks]
+            results = [future.result() for future in futures]
+
+    bands = np.empty((len(events), len(pcts), 3))
+    for block, block_bands in zip(blocks, results):
+        bands[block] = block_bands
+
+    summary_df = pd.DataFrame({
+        'Event_name': events['Event_name'],
+        'GASL_Event_ID': gasl_event_ids(events['Event_name']),
+        'swims': counts,
+    })
+    for level, (standard, _) in enumerate([('gold', gold_pct), ('silver', silver_pct)]):
+        for unit, factor in [('y', 1), ('s', METERS_FACTOR)]:
+            summary_df[f'new_{standard}_{unit}'] = convert_hundredths_to_times(pd.Series(estimates[:, level] * factor))
+            summary_df[f'{standard}_{unit}_low'] = convert_hundredths_to_times(pd.Series(bands[:, level, 0] * factor))
+            summary_df[f'{standard}_{unit}_high'] = convert_hundredths_to_times(pd.Series(bands[:, level, 1] * factor))
+        # width of the yard band and spread of the yard estimates, for sorting out the shaky cutoffs
+        summary_df[f'{standard}_band_hundredths'] = np.round(bands[:, level, 1] - bands[:, level, 0]).astype('int64')
+        summary_df[f'{standard}_std_error_hundredths'] = np.round(bands[:, level, 2], 1)
+
+    # 15-18 events have no silver standard
+    teen = is_teen_event(summary_df['Event_name']).to_numpy()
+    silver_columns = [column for column in summary_df if column.startswith(('silver_', 'new_silver_'))]
+    summary_df[silver_columns] = summary_df[silver_columns].astype(object)
+    summary_df.loc[teen, silver_columns] = ''
+    return summary_df
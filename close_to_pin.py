@@ -1,114 +1,270 @@
+import numpy as np
 import pandas as pd
 import argparse
-from functools import reduce
-from datetime import datetime
-import math
+from concurrent.futures import ProcessPoolExecutor
 import glob
-from utils import read_csv_files, convert_time_to_hundredths
-
-# Modified version of convert_hundredths_to_time that returns empty string for positive differences
-def convert_hundredths_to_time(hundredths):
-    negative = False
-    if hundredths < 0:
-        negative = True
-        hundredths = abs(hundredths)
-    total_seconds = hundredths / 100.0
-    minutes = int(total_seconds // 60)
-    hours = int(minutes // 60)
-    seconds = int(total_seconds % 60)
-    hundredths = int((total_seconds - minutes * 60 - seconds) * 100)
-    if hours > 0:
-        if negative:
-             return f"-{hours:02}:{int(minutes % 60)}:{seconds:02}"
-        else:
-            return f""
-    else:
-        if negative:
-            return f"-{minutes:02}:{seconds:02}.{hundredths:02}"
-        else:
-            return f""
-
-def clean_up_events(row):
-    if row['qualified_for'] == "Gold" or row['qualified_for'] == "Silver":
-        return 0
-    else:
-        return row['silver_diff_hund']
-
-def determine_next_qualifier(row):
-    if row['qualified_for'] == "Gold":
-        return ""
-    if row['qualified_for'] == "Silver":
-        return row['gold_diff_hund']
-    if row['qualified_for'] == "Bronze":
-        return row['silver_diff_hund']
-
-def determine_champ_meet(row):
-    if row['gold_diff_hund'] > 0:
-        return "Gold"
-    if row['silver_diff_hund'] > 0:
-        return f'Silver ({row["gold_diff"]})'
-    
-    if "men" in row['Event_name']:
-        return f'Silver ({row["gold_diff"]})'
-    else:
-        return f'Bronze ({row["silver_diff"]})'
-
-def compare_with_standards(df):
-    df['gold_hund'] = df['gold_y'].apply(lambda x: convert_time_to_hundredths(x))
-    df['silver_hund'] =  df['silver_y'].apply(lambda x: convert_time_to_hundredths(x))
-    
+import hashlib
+import json
+import os
+import time
+from utils import read_csv_files, add_event_names_column, convert_hundredths_to_times, file_hash
+from constants import EVENT_INDEX_FILE, CURRENT_STANDARDS_FILE, CACHE_DIR, CLOSE_TO_PIN_PROFILE_FILE
+from event_index import EventTimeIndex
+from events import is_teen_event
+from profiling import StageProfiler
+from standards import StandardsTable
+
+# Where incremental mode keeps its state and each input file's last report
+STATE_DIR = os.path.join(CACHE_DIR, 'close_to_pin')
+# Seconds between checks for new or changed exports in watch mode
+WATCH_INTERVAL = 0.5
+# Columns every Swimtopia best times export must have
+BEST_TIMES_COLUMNS = ['LastName', 'FirstName', 'AgeGroup', 'Event', 'Age', 'Date', 'SwimMeet', 'Time', 'ConvertedTime', 'ConvertedHundredths']
+
+# Function to label every best time with the championship meet it qualifies for, in one pass.
+# 15-18 events have no bronze meet, so those swimmers go to silver when they miss gold.
+def determine_champ_meet(df):
+    return np.select(
+        [df['gold_diff_hund'] > 0, (df['silver_diff_hund'] > 0) | is_teen_event(df['Event_name'])],
+        ['Gold', 'Silver (' + df['gold_diff'] + ')'],
+        default='Bronze (' + df['silver_diff'] + ')')
+
+# Function to compare every best time with its event's standards in current_standards (a StandardsTable)
+def compare_with_standards(df, current_standards):
+    df['gold_hund'] = current_standards.times(df['Event_name'], 'gold_y')
+    df['silver_hund'] = current_standards.times(df['Event_name'], 'silver_y')
+
     df['gold_diff_hund'] = df['gold_hund'] - df['ConvertedHundredths']
 
     df['silver_diff_hund'] = df['silver_hund'] - df['ConvertedHundredths']
 
-    df['gold_diff'] = df['gold_diff_hund'].apply(lambda x: convert_hundredths_to_time(x))
-    df['silver_diff'] = df['silver_diff_hund'].apply(lambda x: convert_hundredths_to_time(x))
+    # only show how far a swimmer is from a standard they have not made yet
+    df['gold_diff'] = convert_hundredths_to_times(df['gold_diff_hund'], deficits_only=True)
+    df['silver_diff'] = convert_hundredths_to_times(df['silver_diff_hund'], deficits_only=True)
 
-    df['qualified_for'] = df.apply(determine_champ_meet, axis=1)
-    df['next_qualifier'] = df.apply(determine_next_qualifier, axis=1)
-    df['silver_diff_hund'] = df.apply(clean_up_events, axis=1)
+    df['qualified_for'] = determine_champ_meet(df)
 
     df = df.drop(['gold_hund', 'silver_hund', 'gold_diff_hund', 'silver_diff_hund', 'Time', 'ConvertedHundredths'], axis=1)
 
     return df.sort_values(['LastName', 'FirstName'], ascending=[True, True])
     
+# Function to read a Swimtopia best times export with one 'Event_name' per swim.
+# Raises ValueError for an export without the expected columns (such as one still being written).
+def read_best_times(file_path_pattern):
+    best_times = read_csv_files(file_path_pattern)
+    missing = [column for column in BEST_TIMES_COLUMNS if column not in best_times]
+    if missing:
+        raise ValueError(f"{file_path_pattern} is missing the column(s): {', '.join(missing)}")
+    # Create event names from AgeGroup and Event fields
+    event_parts = best_times.Event.str.split(' ', n=1, expand=True)
+    best_times = best_times.assign(distance=event_parts[0], stroke=event_parts[1], age_group=best_times.AgeGroup.astype(str))
+    best_times = add_event_names_column(best_times)
+    return best_times.drop(['AgeGroup', 'Event', 'Age', 'Date', 'SwimMeet', 'age_group', 'distance', 'stroke'], axis=1)
+
+# Function to read the current standards once as a StandardsTable
+def read_current_standards(file=CURRENT_STANDARDS_FILE):
+    return StandardsTable.from_csv(file)
+
+# Function to build the close to pin report for one set of best times against a StandardsTable.
+# time_index is an optional EventTimeIndex used to add each time's league percentile.
+def build_report(best_times, current_standards, time_index=None):
+    best_times_with_standards = best_times[current_standards.contains(best_times['Event_name'])].reset_index(drop=True)
+    for column in ['gold_y', 'silver_y']:
+        best_times_with_standards[column] = current_standards.text_times(best_times_with_standards['Event_name'], column)
+
+    # column order
+    col_order = ["LastName", "FirstName", "Event_name", "ConvertedTime", "qualified_for", "gold_y", "silver_y"]
+
+    # Where each best time ranks among all league swims in the event, when the league index is available
+    if time_index is not None:
+        best_times_with_standards['league_percentile'] = time_index.percentile_ranks(
+            best_times_with_standards['Event_name'], best_times_with_standards['ConvertedHundredths']).round(1)
+        col_order.append('league_percentile')
+
+    compared_times = compare_with_standards(best_times_with_standards, current_standards)
+
+    compared_times = compared_times[col_order]
+    return compared_times.rename(columns={'LastName': 'Last Name', 'FirstName': 'First Name', 'Event_name': 'Event', 'ConvertedTime': 'Best Time', 'qualified_for': 'Championship Meet', 'gold_diff': 'Gold Difference', 'silver_diff': 'Silver Difference', 'gold_y': 'Gold Time', 'silver_y': 'Silver Time', 'league_percentile': 'League Percentile'})
+
+# Load the league event time index, or None when it has not been built
+def load_time_index(path):
+    return EventTimeIndex.load(path) if path and os.path.exists(path) else None
+
+# Standards and league index shared with the batch workers, loaded once per worker
+_report_data = {}
+
+def _init_report_worker(current_standards, index_path):
+    _report_data['current_standards'] = current_standards
+    _report_data['time_index'] = load_time_index(index_path)
+
+# Function to write one team's report; the team is named after its export file
+def write_team_report(file, output_dir):
+    team = os.path.splitext(os.path.basename(file))[0]
+    report = build_report(read_best_times(file), _report_data['current_standards'], _report_data['time_index'])
+    output_file = os.path.join(output_dir, f'{team}_close_to_pin.csv')
+    report.to_csv(output_file, index=False)
+    return team, len(report), output_file
+
+# Function to write a close to pin report for every best times export matching a pattern,
+# one file per task on a process pool. Returns (team, rows, output file) for every team.
+def run_batch(file_path_pattern, output_dir, index_path=EVENT_INDEX_FILE, workers=None):
+    files = sorted(glob.glob(file_path_pattern))
+    os.makedirs(output_dir, exist_ok=True)
+    current_standards = read_current_standards()
+    workers = min(len(files), workers or os.cpu_count() or 1)
+
+    if workers <= 1:
+        _init_report_worker(current_standards, index_path)
+        return [write_team_report(file, output_dir) for file in files]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_report_worker, initargs=(current_standards, index_path)) as executor:
+        return list(executor.map(write_team_report, files, [output_dir] * len(files)))
+
+def _load_state(state_dir):
+    try:
+        with open(os.path.join(state_dir, 'state.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state, state_dir):
+    tmp_file = os.path.join(state_dir, f'state.json.tmp-{os.getpid()}')
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, os.path.join(state_dir, 'state.json'))
+
+# Function to bring the close to pin report up to date, reprocessing only the exports whose
+# content changed since the last run. Every file's report is kept in state_dir and the combined
+# report is rebuilt from them; a change to the standards or the league index reprocesses everything.
+# Returns the combined report and the list of files that were reprocessed.
+def update_report(file_path_pattern, output_file='close_to_pin.csv', index_path=EVENT_INDEX_FILE, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    state = _load_state(state_dir)
+    inputs = {'standards': file_hash(CURRENT_STANDARDS_FILE), 'index': file_hash(index_path)}
+    if state.get('inputs') != inputs:
+        state = {'inputs': inputs, 'files': {}}
+
+    current_standards = time_index = None
+    reports, changed, files = [], [], {}
+    for file in sorted(glob.glob(file_path_pattern)):
+        key = os.path.abspath(file)
+        digest = file_hash(file)
+        report_file = os.path.join(state_dir, hashlib.sha1(key.encode()).hexdigest() + '.csv')
+        entry = state['files'].get(key)
+
+        if entry is None or entry['hash'] != digest or not os.path.exists(report_file):
+            if current_standards is None:
+                current_standards, time_index = read_current_standards(), load_time_index(index_path)
+            build_report(read_best_times(file), current_standards, time_index).to_csv(report_file, index=False)
+            changed.append(file)
+
+        # cached reports are read back as text so they are written out unchanged
+        reports.append(pd.read_csv(report_file, dtype=str, keep_default_na=False))
+        files[key] = {'hash': digest}
+
+    # forget exports that no longer match the pattern
+    for key in set(state['files']) - set(files):
+        report_file = os.path.join(state_dir, hashlib.sha1(key.encode()).hexdigest() + '.csv')
+        if os.path.exists(report_file):
+            os.remove(report_file)
+        changed.append(key)
+
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame()
+    if len(report):
+        report = report.sort_values(['Last Name', 'First Name'], kind='stable', ignore_index=True)
+    if changed or not os.path.exists(output_file):
+        report.to_csv(output_file, index=False)
+    state['files'] = files
+    _save_state(state, state_dir)
+    return report, changed
+
+# Modification times of the exports and the shared inputs, used to notice changes cheaply
+def snapshot_inputs(file_path_pattern, index_path):
+    snapshot = {}
+    for file in sorted(glob.glob(file_path_pattern)) + [CURRENT_STANDARDS_FILE] + ([index_path] if index_path else []):
+        try:
+            stat = os.stat(file)
+            snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            pass
+    return snapshot
+
+# Function to keep the close to pin report up to date as exports land, checking every interval
+# seconds and running update_report whenever a file is added, changed or removed. Runs until interrupted.
+def watch(file_path_pattern, output_file='close_to_pin.csv', index_path=EVENT_INDEX_FILE, interval=WATCH_INTERVAL):
+    print(f'Watching {file_path_pattern} (Ctrl-C to stop)')
+    seen = None
+    try:
+        while True:
+            snapshot = snapshot_inputs(file_path_pattern, index_path)
+            if snapshot != seen:
+                try:
+                    report, changed = update_report(file_path_pattern, output_file, index_path)
+                    seen = snapshot
+                    if changed:
+                        print(f'{time.strftime("%H:%M:%S")} {output_file} updated from {len(changed)} changed file(s), {len(report)} times')
+                except (OSError, ValueError, KeyError) as e:
+                    # most likely an export that is still being written; retry on the next check
+                    print(f'Unable to update {output_file}: {e}')
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
 def main():
     parser = argparse.ArgumentParser(__file__)
 
-    parser.add_argument("file", default=None, help="Best times file exported from Swimtopia (required)")
+    parser.add_argument("file", default=None, help="Best times file exported from Swimtopia (required); with --batch, a pattern matching every team's export")
+
+    parser.add_argument("--index", default=EVENT_INDEX_FILE, help=f"League event time index written by gasl_time_standards.py (default: {EVENT_INDEX_FILE})")
+    parser.add_argument("--batch", action="store_true", help="Write a separate report for each matching file, named after the file")
+    parser.add_argument("--output-dir", default='.', help="Directory for the batch reports (default: current directory)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for batch mode (default: one per CPU)")
+    parser.add_argument("--incremental", action="store_true", help="Only reprocess exports that changed since the last run and merge them into close_to_pin.csv")
+    parser.add_argument("--watch", action="store_true", help="Keep running and update close_to_pin.csv whenever an export changes (implies --incremental)")
+    parser.add_argument("--profile", action="store_true", help=f"Record time, CPU and memory for each stage in {CLOSE_TO_PIN_PROFILE_FILE}")
 
     options = parser.parse_args()
 
-    # Read the CSV file
-    best_times = read_csv_files(options.file)
-    # Create event names from AgeGroup and Event fields
-    best_times = best_times.assign(
-        distance=best_times.Event.str.split(' ',n=1, expand=True)[0],
-        stroke=best_times.Event.str.split(' ',n=1, expand=True)[1],
-        age_group=best_times.AgeGroup.astype(str)
-    )
-    # Use our utility to create the Event_name field
-    from utils import add_event_names_column
-    best_times = add_event_names_column(best_times)
-    best_times = best_times.drop(['AgeGroup', 'Event', 'Age', 'Date', 'SwimMeet', 'age_group', 'distance', 'stroke'], axis=1)
+    profiler = StageProfiler(enabled=options.profile)
+    if options.batch:
+        with profiler.stage('batch reports') as stage:
+            reports = run_batch(options.file, options.output_dir, options.index, options.workers)
+            stage['rows'] = sum(rows for _, rows, _ in reports)
+        for team, rows, output_file in reports:
+            print(f'{team}: {rows} times written to {output_file}')
+        profiler.write(os.path.join(options.output_dir, CLOSE_TO_PIN_PROFILE_FILE), mode='batch', options=vars(options))
+        return
 
-    # Get the current standards, generate event_names
-    current_standards = read_csv_files('./current_standards.csv')
-    # Use our utility to create event names
-    from utils import add_event_names_column
-    current_standards = add_event_names_column(current_standards)
-    current_standards = current_standards.drop(['age_group', 'distance', 'stroke','gold_s', 'silver_s'], axis=1)
+    if options.watch:
+        watch(options.file, index_path=options.index)
+        return
 
-    best_times_with_standards = pd.merge(best_times, current_standards, on='Event_name')
-    compared_times = compare_with_standards(best_times_with_standards)
-    
-    # column order
-    col_order = ["LastName", "FirstName", "Event_name", "ConvertedTime", "qualified_for", "gold_y", "silver_y"]
-    compared_times = compared_times[col_order]
-    compared_times.rename(columns={'LastName': 'Last Name', 'FirstName': 'First Name', 'Event_name': 'Event', 'ConvertedTime': 'Best Time', 'qualified_for': 'Championship Meet', 'gold_diff': 'Gold Difference', 'silver_diff': 'Silver Difference', 'gold_y': 'Gold Time', 'silver_y': 'Silver Time'}, inplace=True)
+    if options.incremental:
+        with profiler.stage('incremental update') as stage:
+            try:
+                report, changed = update_report(options.file, index_path=options.index)
+            except ValueError as e:
+                parser.exit(1, f'Unable to update close_to_pin.csv: {e}\n')
+            stage['rows'] = len(report)
+        print(f'{len(changed)} changed file(s) reprocessed')
+        profiler.write(CLOSE_TO_PIN_PROFILE_FILE, mode='incremental', options=vars(options))
+        return
 
-    compared_times.to_csv('close_to_pin.csv', index=False)
+    with profiler.stage('read best times') as stage:
+        best_times = read_best_times(options.file)
+        stage['rows'] = len(best_times)
+    with profiler.stage('read standards and index') as stage:
+        current_standards = read_current_standards()
+        time_index = load_time_index(options.index)
+        stage['rows'] = len(current_standards)
+    with profiler.stage('build report') as stage:
+        report = build_report(best_times, current_standards, time_index)
+        stage['rows'] = len(report)
+    with profiler.stage('write report') as stage:
+        report.to_csv('close_to_pin.csv', index=False)
+        stage['rows'] = len(report)
+    profiler.write(CLOSE_TO_PIN_PROFILE_FILE, mode='single', options=vars(options))
 
 # Main execution
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
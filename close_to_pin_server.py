@@ -0,0 +1,156 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+from constants import EVENT_INDEX_FILE
+from close_to_pin import read_best_times, read_current_standards, load_time_index, build_report, snapshot_inputs, WATCH_INTERVAL
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+# Close to pin report of every team's export, built once and indexed by team, swimmer and event
+# so each query is a dictionary lookup.
+class CloseToPinData:
+    def __init__(self, file_path_pattern, index_path=EVENT_INDEX_FILE):
+        self.snapshot = snapshot_inputs(file_path_pattern, index_path)
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+        current_standards = read_current_standards()
+        time_index = load_time_index(index_path)
+        reports = []
+        for file in sorted(glob.glob(file_path_pattern)):
+            report = build_report(read_best_times(file), current_standards, time_index)
+            report.insert(0, 'Team', os.path.splitext(os.path.basename(file))[0])
+            reports.append(report)
+        report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=['Team', 'Last Name', 'First Name', 'Event'])
+
+        # JSON has no NaN, so missing values become null
+        self.records = report.astype(object).where(report.notna(), None).to_dict('records')
+        self.teams = sorted(report['Team'].astype(str).unique())
+        self.events = sorted(report['Event'].astype(str).unique())
+        self.by_team, self.by_swimmer, self.by_event = {}, {}, {}
+        for record in self.records:
+            self.by_team.setdefault(record['Team'].lower(), []).append(record)
+            self.by_swimmer.setdefault((record['Last Name'].lower(), record['First Name'].lower()), []).append(record)
+            self.by_event.setdefault(record['Event'].lower(), []).append(record)
+
+    # Event names matching a query such as 'Girls 9-10_25_Backstroke' or just '25_back'
+    def matching_events(self, query):
+        query = query.lower().replace(' ', '_')
+        return [event for event in self.events if query in event.lower().replace(' ', '_')]
+
+
+# Keeps the latest CloseToPinData, rebuilding it in the background whenever an export,
+# the standards or the league index changes
+class CloseToPinService:
+    def __init__(self, file_path_pattern, index_path=EVENT_INDEX_FILE, interval=WATCH_INTERVAL):
+        self.file_path_pattern = file_path_pattern
+        self.index_path = index_path
+        self.interval = interval
+        self.data = CloseToPinData(file_path_pattern, index_path)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            if snapshot_inputs(self.file_path_pattern, self.index_path) != self.data.snapshot:
+                try:
+                    # queries keep using the previous data until the new data is complete
+                    self.data = CloseToPinData(self.file_path_pattern, self.index_path)
+                    print(f'{time.strftime("%H:%M:%S")} reloaded {len(self.data.records)} times')
+                except Exception as e:
+                    # most likely an export that is still being written; anything else is reported the
+                    # same way, so the thread keeps serving the last good data and retries on the next change
+                    print(f'Unable to reload: {type(e).__name__}: {e}')
+                    self.data.snapshot = snapshot_inputs(self.file_path_pattern, self.index_path)
+
+    def start_watching(self):
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    # Function to answer a query path (/swimmer, /team, /event or /status) with a JSON-ready dict.
+    # Raises KeyError for unknown paths and ValueError for missing parameters.
+    def query(self, path, params):
+        data = self.data
+        team = params.get('team', '').lower()
+
+        if path == '/status':
+            return {'loaded_at': data.loaded_at, 'times': len(data.records), 'teams': data.teams, 'events': data.events}
+        if path == '/team':
+            if not team:
+                raise ValueError('team is required')
+            return {'team': params['team'], 'times': data.by_team.get(team, [])}
+        if path == '/swimmer':
+            if 'last' not in params or 'first' not in params:
+                raise ValueError('last and first are required')
+            times = data.by_swimmer.get((params['last'].lower(), params['first'].lower()), [])
+        elif path == '/event':
+            if 'event' not in params:
+                raise ValueError('event is required')
+            times = [record for event in data.matching_events(params['event']) for record in data.by_event[event.lower()]]
+        else:
+            raise KeyError(path)
+
+        if team:
+            times = [record for record in times if record['Team'].lower() == team]
+        if 'event' in params and path == '/swimmer':
+            events = {event.lower() for event in data.matching_events(params['event'])}
+            times = [record for record in times if record['Event'].lower() in events]
+        return {**params, 'times': times}
+
+
+def make_handler(service):
+    class CloseToPinHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                self._send(200, service.query(url.path.rstrip('/') or '/status', params))
+            except KeyError:
+                self._send(404, {'error': f'unknown query {url.path}; use /swimmer, /team, /event or /status'})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        # keep the console for reload messages
+        def log_message(self, format, *args):
+            pass
+
+    return CloseToPinHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(__file__, description="Serve close to pin lookups over local HTTP/JSON")
+
+    parser.add_argument("files", help="Pattern matching every team's best times export, e.g. \"exports/*.csv\"")
+    parser.add_argument("--index", default=EVENT_INDEX_FILE, help=f"League event time index written by gasl_time_standards.py (default: {EVENT_INDEX_FILE})")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST}, this computer only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+
+    options = parser.parse_args()
+
+    service = CloseToPinService(options.files, options.index)
+    service.start_watching()
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(service))
+    print(f'Serving {len(service.data.records)} times from {len(service.data.teams)} teams on http://{options.host}:{options.port} (Ctrl-C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,49 @@ DEFAULT_GOLD_PERCENTILE = 0.2
 DEFAULT_SILVER_PERCENTILE = 0.6
 DEFAULT_HEAT_TIME_SECONDS = 15
 DEFAULT_EVENT_TIME_SECONDS = 30
+DEFAULT_LANES = 6
+
+# Bronze has no standard, so bronze heats are estimated at this percentile of the bronze entrants' times
+BRONZE_HEAT_PERCENTILE = 0.9
+
+# Short-course meters standards are the yards standard scaled by this factor
+METERS_FACTOR = 1.11
 
 # File paths
 CURRENT_STANDARDS_FILE = './current_standards.csv'
+CACHE_DIR = './.gasl_cache'
+# Largest total size of the memoized stage results kept under CACHE_DIR; the least recently used go first
+STAGE_CACHE_MAX_MB = 512
+# Per-stage timing and memory reports written with --profile, next to each tool's outputs
+PROFILE_FILE = 'gasl_time_standards_profile.json'
+CLOSE_TO_PIN_PROFILE_FILE = 'close_to_pin_profile.json'
+EVENT_INDEX_FILE = './event_time_index.npz'
+SEASON_SUMMARY_FILE = 'season_meet_summary.csv'
 
 # Meet ranking order (for sorting)
-MEET_RANKING = [GOLD, SILVER, BRONZE]
\ No newline at end of file
+MEET_RANKING = [GOLD, SILVER, BRONZE]
+
+# There is one Gold Meet; the silver and bronze swimmers are split over two meets each
+MEETS_PER_LEVEL = {'gold': 1, 'silver': 2, 'bronze': 2}
+
+# Individual events each athlete may swim at their championship meet, overall and per meet
+# (the per-meet limits are used by the meet_entry_limit dedup policy)
+DEFAULT_ENTRY_LIMIT = 3
+MEET_ENTRY_LIMITS = {GOLD: 3, SILVER: 3, BRONZE: 3}
+
+# Columns that together identify one athlete in the results files
+ATHLETE_KEY_COLUMNS = ['first_name', 'last_name', 'team_abbr', 'age']
+
+# Columns read from the gasl*.csv results files and their fixed dtypes.
+# converted_hundredths is read as float so missing times survive parsing and can be dropped.
+RESULTS_SCHEMA = {
+    'first_name': 'category',
+    'last_name': 'category',
+    'team_abbr': 'category',
+    'age': 'int16',
+    'age_group': 'category',
+    'distance': 'int16',
+    'stroke': 'category',
+    'converted_hundredths': 'float64',
+    'date': 'category',
+}
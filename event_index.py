@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+
+# Persistent per-event cumulative-count index over hundredths. Row e, column k holds the number of
+# times in event e faster than offset + k hundredths, so "what percentile is this time?" is a single
+# array lookup and "what time is this percentile?" is a binary search over the fixed hundredths
+# range, independent of how many swims were indexed.
+class EventTimeIndex:
+    def __init__(self, events, offset, cumulative):
+        self.events = pd.Index(events)
+        self.offset = int(offset)
+        self.cumulative = cumulative
+        self.totals = cumulative[:, -1]
+        self._search_keys = None
+
+    # Build the index from a results DataFrame with 'Event_name' and hundredths columns
+    @classmethod
+    def from_results(cls, df, time_column='converted_hundredths'):
+        codes, events = pd.factorize(df['Event_name'].astype(str), sort=True)
+        values = df[time_column].to_numpy(dtype='int64')
+        offset = int(values.min())
+        width = int(values.max()) - offset + 1
+        counts = np.bincount(codes * width + (values - offset), minlength=len(events) * width)
+        return cls._from_counts(events, offset, counts.reshape(len(events), width))
+
+    # Build the index from per-event TimeHistograms, e.g. the streaming aggregates
+    @classmethod
+    def from_histograms(cls, histograms):
+        histograms = {event: histogram for event, histogram in sorted(histograms.items()) if histogram.total()}
+        offset = min(histogram.offset for histogram in histograms.values())
+        width = max(histogram.offset + len(histogram.counts) for histogram in histograms.values()) - offset
+        counts = np.zeros((len(histograms), width), dtype='int64')
+        for row, histogram in enumerate(histograms.values()):
+            start = histogram.offset - offset
+            counts[row, start:start + len(histogram.counts)] = histogram.counts
+        return cls._from_counts(list(histograms), offset, counts)
+
+    @classmethod
+    def _from_counts(cls, events, offset, counts):
+        cumulative = np.zeros((counts.shape[0], counts.shape[1] + 1), dtype='int32')
+        np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+        return cls(events, offset, cumulative)
+
+    # Save the index to a .npz file
+    def save(self, path):
+        np.savez_compressed(path, events=np.asarray(self.events, dtype=str), offset=self.offset, cumulative=self.cumulative)
+
+    # Load an index written by save()
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['events'].tolist(), int(data['offset']), data['cumulative'])
+
+    # Row of every event name, -1 for events not in the index
+    def _rows(self, events):
+        return self.events.get_indexer(pd.Index(np.asarray(events, dtype=object).ravel()))
+
+    # Percentage of each event's times strictly faster than the given time, for arrays of (event, time)
+    def percentile_ranks(self, events, times):
+        rows = self._rows(events)
+        times = np.asarray(times, dtype='float64').ravel()
+        columns = np.clip(np.ceil(np.nan_to_num(times, nan=0)) - self.offset, 0, self.cumulative.shape[1] - 1).astype('int64')
+        known = (rows >= 0) & ~np.isnan(times)
+        safe_rows = np.where(known, rows, 0)
+        ranks = self.cumulative[safe_rows, columns] / np.maximum(self.totals[safe_rows], 1) * 100
+        return np.where(known, ranks, np.nan)
+
+    # Linearly interpolated percentile times (matching Series.quantile) for arrays of (event, pct)
+    def times_at_percentiles(self, events, pcts):
+        rows = self._rows(events)
+        pcts = np.asarray(pcts, dtype='float64').ravel()
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+        totals = self.totals[safe_rows].astype('float64')
+
+        position = pcts * np.maximum(totals - 1, 0)
+        below = np.floor(position)
+        above = np.minimum(below + 1, np.maximum(totals - 1, 0))
+        fraction = position - below
+        low = self._time_at_rank(safe_rows, below)
+        high = self._time_at_rank(safe_rows, above)
+        difference = high - low
+        values = np.where(fraction >= 0.5, high - difference * (1 - fraction), low + difference * fraction)
+        return np.where(known & (totals > 0), values, np.nan)
+
+    # Time of the rank-th fastest swim (0-based) in each row, with one searchsorted over all rows
+    def _time_at_rank(self, rows, ranks):
+        band = int(self.totals.max()) + 1
+        width = self.cumulative.shape[1] - 1
+        if self._search_keys is None:
+            # at_or_below counts are monotone within a row; banding rows makes the whole array monotone
+            bands = np.arange(len(self.events), dtype='int64')[:, None] * band
+            self._search_keys = (self.cumulative[:, 1:] + bands).ravel()
+        positions = np.searchsorted(self._search_keys, rows * band + ranks, side='right')
+        return (positions - rows * width + self.offset).astype('float64')
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from constants import MEET_RANKING
+
+# Every individual event swum in the league: (age_group, distance, stroke, GASL event ID).
+# An event's position in this list is its integer event code.
+EVENTS = [
+    ('Boys 10 & Under', 100, 'Individual Medley', 4),
+    ('Boys 11-12', 50, 'Backstroke', 30),
+    ('Boys 11-12', 50, 'Breaststroke', 40),
+    ('Boys 11-12', 50, 'Butterfly', 50),
+    ('Boys 11-12', 50, 'Freestyle', 18),
+    ('Boys 11-12', 100, 'Individual Medley', 6),
+    ('Boys 13-14', 50, 'Backstroke', 32),
+    ('Boys 13-14', 50, 'Breaststroke', 42),
+    ('Boys 13-14', 50, 'Butterfly', 52),
+    ('Boys 13-14', 50, 'Freestyle', 20),
+    ('Boys 13-14', 100, 'Individual Medley', 8),
+    ('Boys 6 & Under', 25, 'Backstroke', 24),
+    ('Boys 6 & Under', 25, 'Freestyle', 12),
+    ('Boys 7-8', 25, 'Backstroke', 26),
+    ('Boys 7-8', 25, 'Freestyle', 14),
+    ('Boys 8 & Under', 25, 'Breaststroke', 36),
+    ('Boys 8 & Under', 25, 'Butterfly', 46),
+    ('Boys 9-10', 25, 'Backstroke', 28),
+    ('Boys 9-10', 25, 'Breaststroke', 38),
+    ('Boys 9-10', 25, 'Butterfly', 48),
+    ('Boys 9-10', 50, 'Freestyle', 16),
+    ('Girls 10 & Under', 100, 'Individual Medley', 5),
+    ('Girls 11-12', 50, 'Backstroke', 31),
+    ('Girls 11-12', 50, 'Breaststroke', 41),
+    ('Girls 11-12', 50, 'Butterfly', 51),
+    ('Girls 11-12', 50, 'Freestyle', 19),
+    ('Girls 11-12', 100, 'Individual Medley', 7),
+    ('Girls 13-14', 50, 'Backstroke', 33),
+    ('Girls 13-14', 50, 'Breaststroke', 43),
+    ('Girls 13-14', 50, 'Butterfly', 53),
+    ('Girls 13-14', 50, 'Freestyle', 21),
+    ('Girls 13-14', 100, 'Individual Medley', 9),
+    ('Girls 6 & Under', 25, 'Backstroke', 25),
+    ('Girls 6 & Under', 25, 'Freestyle', 13),
+    ('Girls 7-8', 25, 'Backstroke', 27),
+    ('Girls 7-8', 25, 'Freestyle', 15),
+    ('Girls 8 & Under', 25, 'Breaststroke', 37),
+    ('Girls 8 & Under', 25, 'Butterfly', 47),
+    ('Girls 9-10', 25, 'Backstroke', 29),
+    ('Girls 9-10', 25, 'Breaststroke', 39),
+    ('Girls 9-10', 25, 'Butterfly', 49),
+    ('Girls 9-10', 50, 'Freestyle', 17),
+    ('Men 15-18', 50, 'Backstroke', 34),
+    ('Men 15-18', 50, 'Breaststroke', 44),
+    ('Men 15-18', 50, 'Butterfly', 54),
+    ('Men 15-18', 50, 'Freestyle', 22),
+    ('Men 15-18', 100, 'Individual Medley', 10),
+    ('Women 15-18', 50, 'Backstroke', 35),
+    ('Women 15-18', 50, 'Breaststroke', 45),
+    ('Women 15-18', 50, 'Butterfly', 55),
+    ('Women 15-18', 50, 'Freestyle', 23),
+    ('Women 15-18', 100, 'Individual Medley', 11),
+]
+
+# One row per event, indexed by event code, with its GASL event ID and display name
+EVENT_CATALOGUE = pd.DataFrame(EVENTS, columns=['age_group', 'distance', 'stroke', 'GASL_Event_ID'])
+EVENT_CATALOGUE['Event_name'] = (EVENT_CATALOGUE['age_group'] + '_' + EVENT_CATALOGUE['distance'].astype(str)
+                                 + '_' + EVENT_CATALOGUE['stroke'])
+EVENT_CATALOGUE.index.name = 'event_code'
+
+_EVENT_NAMES = pd.Index(EVENT_CATALOGUE['Event_name'])
+_GASL_EVENT_IDS = pd.Series(EVENT_CATALOGUE['GASL_Event_ID'].to_numpy(), index=_EVENT_NAMES)
+
+
+# Categorical dtype for event names: the catalogue's events first, so their category codes are the
+# event codes, then any other events seen in the data, sorted
+def event_dtype(event_names=()):
+    extra = sorted(set(event_names) - set(_EVENT_NAMES))
+    return pd.CategoricalDtype(list(_EVENT_NAMES) + extra)
+
+
+# Function to build the categorical event name of every row from its age group, distance and stroke.
+# Each distinct event's name is built once, however many swims it has.
+def event_names(age_group, distance, stroke):
+    parts = pd.DataFrame({'age_group': age_group, 'distance': distance, 'stroke': stroke})
+    codes, uniques = pd.factorize(pd.MultiIndex.from_frame(parts.astype(str)))
+    names = np.array([f'{a}_{d}_{s}' for a, d, s in uniques], dtype=object)
+    dtype = event_dtype(names)
+    category_codes = dtype.categories.get_indexer(names)
+    return pd.Series(pd.Categorical.from_codes(category_codes[codes], dtype=dtype), index=parts.index)
+
+
+# Whether each event is a 15-18 event (these have no bronze meet), checked once per distinct name
+def is_teen_event(names):
+    names = pd.Series(names, copy=False).astype('category')
+    teen = names.cat.categories.astype(str).str.contains('15-18', regex=False)
+    return pd.Series(np.where(names.cat.codes >= 0, teen[names.cat.codes], False), index=names.index)
+
+
+# GASL event ID of every event name (0 for events outside the catalogue)
+def gasl_event_ids(names):
+    return pd.Series(names, copy=False).astype(object).map(_GASL_EVENT_IDS).fillna(0).astype('int64')
+
+
+# Level of every swim against per-swim gold and silver times, as its position in MEET_RANKING
+# (0 gold, 1 silver, 2 bronze), for arrays of any matching shape. teen marks 15-18 events, which
+# have no bronze meet, so those swims still swim at silver when they are slower than silver.
+def meet_levels(hundredths, gold, silver, teen):
+    return np.where(hundredths <= gold, 0, np.where((hundredths <= silver) | teen, 1, 2))
+
+
+# Classify every swim as GOLD/SILVER/BRONZE against per-swim gold and silver times in one pass
+def classify_meet(hundredths, gold, silver, event_names):
+    return np.asarray(MEET_RANKING)[meet_levels(hundredths, gold, silver, is_teen_event(event_names))]
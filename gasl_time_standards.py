@@ -1,471 +1,202 @@
 import pandas as pd
-from functools import reduce
-from datetime import datetime
-import math
-import glob
-import hashlib
-from utils import read_csv_files, convert_hundredths_to_time, convert_time_to_hundredths, create_event_name, add_event_names_column
-
-# Function to read CSV files and concatenate them into a single DataFrame
-def read_csv_files(file_path_pattern):
-    # Use glob to find all files matching the pattern
-    files = glob.glob(file_path_pattern)
-    # Read all files and concatenate them into a single DataFrame
-    df_list = [pd.read_csv(file) for file in files]
-    combined_df = pd.concat(df_list, ignore_index=True)
-    return combined_df
-
-# Function to convert hundredths of a second to MM:SS.hh format
-def convert_hundredths_to_time(hundredths):
-    negative = False
-    if hundredths < 0:
-        negative = True
-        hundredths = abs(hundredths)
-    total_seconds = hundredths / 100.0
-    minutes = int(total_seconds // 60)
-    hours = int(minutes // 60)
-    seconds = int(total_seconds % 60)
-    hundredths = int((total_seconds - minutes * 60 - seconds) * 100)
-    if hours > 0:
-        if negative:
-             return f"-{hours:02}:{int(minutes % 60)}:{seconds:02}"
-        else:
-            return f"{hours:02}:{int(minutes % 60)}:{seconds:02}"
-    else:
-        if negative:
-            return f"-{minutes:02}:{seconds:02}.{hundredths:02}"
-        else:
-            return f"{minutes:02}:{seconds:02}.{hundredths:02}"
-
-def gasl_event_id(event):
-    event_map = {
-        "Boys 10 & Under_100_Individual Medley" : 4,
-        "Boys 11-12_50_Backstroke" : 30,
-        "Boys 11-12_50_Breaststroke" : 40,
-        "Boys 11-12_50_Butterfly" : 50,
-        "Boys 11-12_50_Freestyle" : 18,
-        "Boys 11-12_100_Individual Medley" : 6,
-        "Boys 13-14_50_Backstroke" : 32,
-        "Boys 13-14_50_Breaststroke" : 42,
-        "Boys 13-14_50_Butterfly" : 52,
-        "Boys 13-14_50_Freestyle" : 20,
-        "Boys 13-14_100_Individual Medley" : 8,
-        "Boys 6 & Under_25_Backstroke" : 24,
-        "Boys 6 & Under_25_Freestyle" : 12,
-        "Boys 7-8_25_Backstroke" : 26,
-        "Boys 7-8_25_Freestyle" : 14,
-        "Boys 8 & Under_25_Breaststroke" : 36,
-        "Boys 8 & Under_25_Butterfly" : 46,
-        "Boys 9-10_25_Backstroke" : 28,
-        "Boys 9-10_25_Breaststroke" : 38,
-        "Boys 9-10_25_Butterfly" : 48,
-        "Boys 9-10_50_Freestyle" : 16,
-        "Girls 10 & Under_100_Individual Medley" : 5,
-        "Girls 11-12_50_Backstroke" : 31,
-        "Girls 11-12_50_Breaststroke" : 41,
-        "Girls 11-12_50_Butterfly" : 51,
-        "Girls 11-12_50_Freestyle" : 19,
-        "Girls 11-12_100_Individual Medley" : 7,
-        "Girls 13-14_50_Backstroke" : 33,
-        "Girls 13-14_50_Breaststroke" : 43,
-        "Girls 13-14_50_Butterfly" : 53,
-        "Girls 13-14_50_Freestyle" : 21,
-        "Girls 13-14_100_Individual Medley" : 9,
-        "Girls 6 & Under_25_Backstroke" : 25,
-        "Girls 6 & Under_25_Freestyle" : 13,
-        "Girls 7-8_25_Backstroke" : 27,
-        "Girls 7-8_25_Freestyle" : 15,
-        "Girls 8 & Under_25_Breaststroke" : 37,
-        "Girls 8 & Under_25_Butterfly" : 47,
-        "Girls 9-10_25_Backstroke" : 29,
-        "Girls 9-10_25_Breaststroke" : 39,
-        "Girls 9-10_25_Butterfly" : 49,
-        "Girls 9-10_50_Freestyle" : 17,
-        "Men 15-18_50_Backstroke" : 34,
-        "Men 15-18_50_Breaststroke" : 44,
-        "Men 15-18_50_Butterfly" : 54,
-        "Men 15-18_50_Freestyle" : 22,
-        "Men 15-18_100_Individual Medley" : 10,
-        "Women 15-18_50_Backstroke" : 35,
-        "Women 15-18_50_Breaststroke" : 45,
-        "Women 15-18_50_Butterfly" : 55,
-        "Women 15-18_50_Freestyle" : 23,
-        "Women 15-18_100_Individual Medley" : 11
-    }
-
-    if event in event_map:
-        return event_map[event]
-    else:
-        return 0
-
-def convert_time_to_hundredths(time):
-    if not isinstance(time, str):
-        return 0
-    if ":" not in time:
-        time = f'00:{time}'
-    minutes = int(time.split(":")[0])
-    seconds_with_hundredths = time.split(":")[1]
-    
-    try:
-        seconds = int(int(seconds_with_hundredths.split('.')[0]) + (minutes * 60))
-    except:
-        print(time)
-    hundredths = int(seconds_with_hundredths.split('.')[1])
-    
-    total_hundredths = int((hundredths + (seconds * 100)))
-    return total_hundredths
-
-# Function to get the 90th percentile threshold and count of values meeting/exceeding the threshold for each unique event
-def get_percentile_summary(df, standard, pct):
-    # Group by 'age_group', 'distance', and 'stroke' to create unique events
-    grouped = df.groupby(['age_group', 'distance', 'stroke'])
-    # print(df.columns.tolist())
-    # Lists to store the results
-    event_names = []
-    event_ids = []
-    thresholds = []
-    thresholds_meters = []
-    counts = []
-    
-    # Process each group
-    for name, group in grouped:
-        # if standard.lower() == "silver":
-        #     if "15-18" in name[0]:
-        #         print("need to do something about silver events for 15-18")
-
-        # Calculate the 90th percentile threshold
-        threshold_value = group['converted_hundredths'].quantile(pct)
-        # Convert the threshold value to MM:SS.hh format
-        threshold = convert_hundredths_to_time(threshold_value)
-        # # Count the number of entries meeting or exceeding the threshold
-        count = (group['converted_hundredths'] >= threshold_value).sum()
-        
-        # Create the event name
-        event_name = f"{name[0]}_{name[1]}_{name[2]}"
-        event_id = gasl_event_id(event_name)
-        
-        # Store the results
-        event_names.append(event_name)
-        event_ids.append(event_id)
-        thresholds.append(threshold)
-        thresholds_meters.append(convert_hundredths_to_time(threshold_value * 1.11))
-        counts.append(count)
-    
-    # Create a summary DataFrame
-    summary_df = pd.DataFrame({
-        'Event_name': event_names,
-        'GASL_Event_ID': event_ids,
-        f'new_{standard}_y': thresholds,
-        f'new_{standard}_s' : thresholds_meters
-    })
-    return summary_df
-
-def get_current_percentile_summary(df, standard, current_times):
-    # Group by 'age_group', 'distance', and 'stroke' to create unique events
-    grouped = df.groupby(['age_group', 'distance', 'stroke'])
-    # print(df.columns.tolist())
-    # Lists to store the results
-    event_names = []
-    current_gold_times = []
-    current_silver_times = []
-    current_gold_percentile = []
-    current_silver_percentile = []
-    thresholds = []
-    thresholds_meters = []
-    counts = []
-    
-    # print(current_times)
-    # Process each group
-    for name, group in grouped:
-        
-        # Calculate the 90th percentile threshold
-        # threshold_value = group['converted_hundredths'].quantile(.15)
-        # print(threshold_value)
-        # Convert the threshold value to MM:SS.hh format
-        # threshold = convert_hundredths_to_time(threshold_value)
-        # # Count the number of entries meeting or exceeding the threshold
-        # count = (group['converted_hundredths'] >= threshold_value).sum()
-        
-        # Create the event name
-        event_name = f"{name[0]}_{name[1]}_{name[2]}"
-        gold_time = current_times.loc[current_times['Event_name'] == event_name, 'gold_y'].values[0]
-        gold_time_hundreths = convert_time_to_hundredths(gold_time)
-
-        # gold_percentile = group['converted_hundredths'].quantile(gold_time_hundreths/100)
-        gold_percentile = (group['converted_hundredths'] < gold_time_hundreths).mean() * 100
-        
-        silver_time = current_times.loc[current_times['Event_name'] == event_name, 'silver_y'].values[0]
-        silver_time_hundreths = convert_time_to_hundredths(silver_time)
-        silver_percentile = (group['converted_hundredths'] < silver_time_hundreths).mean() * 100
-
-
-        # Store the results
-        event_names.append(event_name)
-        current_gold_times.append(gold_time_hundreths)
-        current_gold_percentile.append(gold_percentile)
-        current_silver_times.append(silver_time_hundreths)
-        current_silver_percentile.append(silver_percentile)
-        # thresholds.append(threshold)
-    
+import numpy as np
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from constants import PROFILE_FILE, SEASON_SUMMARY_FILE, GOLD, SILVER, BRONZE, MEET_RANKING, MEETS_PER_LEVEL, METERS_FACTOR, EVENT_INDEX_FILE, DEFAULT_GOLD_PERCENTILE, DEFAULT_SILVER_PERCENTILE, DEFAULT_HEAT_TIME_SECONDS, DEFAULT_EVENT_TIME_SECONDS, DEFAULT_LANES
+from ingest_cache import load_results
+from percentiles import EVENT_COLUMNS, sort_event_times, event_quantiles, get_event_names, get_proposed_standards
+from event_index import EventTimeIndex
+from attendance import TeamAttendanceIndex
+from meet_duration import (estimate_meet_durations, simulate_meet_durations, dedup_entries, summarize_meets,
+                           widen_meet_durations, RELAY_TIME)
+from utils import convert_hundredths_to_time, convert_times_to_hundredths, convert_hundredths_to_times, report_malformed_times, get_seasons, add_event_names_column
+from events import gasl_event_ids, classify_meet
+from profiling import StageProfiler
+from standards import StandardsTable, load_current_standards
+from bootstrap import get_bootstrap_summary, DEFAULT_CONFIDENCE
+from stage_cache import StageCache, input_fingerprint
+from seeding import seed_heats, heat_timeline, event_and_session_timelines
+
+# Columns of the heat sheets written with --heat-sheets
+HEAT_SHEET_COLUMNS = ['season', 'qualified_meet', 'meet', 'GASL_Event_ID', 'Event_name', 'heat', 'lane', 'last_name', 'first_name', 'team_abbr', 'age', 'seed_time']
+
+# Options only the batch run uses and options only the interactive run uses, with the defaults filled in
+# for the mode that uses them. Each is rejected in the other mode rather than silently ignored.
+BATCH_OPTIONS = {'gold_pct': [DEFAULT_GOLD_PERCENTILE], 'silver_pct': [DEFAULT_SILVER_PERCENTILE], 'heat_time': [DEFAULT_HEAT_TIME_SECONDS],
+                 'event_time': [DEFAULT_EVENT_TIME_SECONDS], 'output': 'scenario_results.csv', 'attendance_output': None, 'sweep_output': None}
+INTERACTIVE_OPTIONS = {'heat_sheets': False, 'lanes': DEFAULT_LANES, 'bootstrap': 0, 'bootstrap_by': 'swim', 'confidence': DEFAULT_CONFIDENCE}
+# Options the interactive run takes one value of in place of its prompt
+PROMPTED_OPTIONS = ['gold_pct', 'silver_pct', 'heat_time', 'event_time']
+
+# Function to get proposed gold/silver standards for every (gold_pct, silver_pct) pair in a grid.
+# Each event's times are sorted once and every percentile is read off the same sorted arrays,
+# giving one tidy row per scenario and event.
+def get_percentile_sweep(df, gold_pcts, silver_pcts):
+    events, sorted_values = sort_event_times(df)
+    pcts = np.unique(np.concatenate([np.asarray(gold_pcts, dtype='float64'), np.asarray(silver_pcts, dtype='float64')]))
+    quantiles = event_quantiles(events, sorted_values, pcts)
+
+    # one row per (gold_pct, silver_pct, event)
+    grid = pd.MultiIndex.from_product([gold_pcts, silver_pcts], names=['gold_pct', 'silver_pct']).to_frame(index=False)
+    grid = grid.merge(events[['Event_name']].reset_index(names='event_index'), how='cross')
+    gold_values = pd.Series(quantiles[grid['event_index'], np.searchsorted(pcts, grid['gold_pct'])])
+    silver_values = pd.Series(quantiles[grid['event_index'], np.searchsorted(pcts, grid['silver_pct'])])
+
+    sweep_df = grid.drop(columns='event_index')
+    sweep_df['GASL_Event_ID'] = gasl_event_ids(sweep_df['Event_name'])
+    sweep_df['new_gold_hundredths'] = gold_values
+    sweep_df['new_silver_hundredths'] = silver_values
+    sweep_df['new_gold_y'] = convert_hundredths_to_times(gold_values)
+    sweep_df['new_gold_s'] = convert_hundredths_to_times(gold_values * METERS_FACTOR)
+    sweep_df['new_silver_y'] = convert_hundredths_to_times(silver_values)
+    sweep_df['new_silver_s'] = convert_hundredths_to_times(silver_values * METERS_FACTOR)
+    return sweep_df
+
+# Function to get every team's athletes at each meet for every (gold_pct, silver_pct) pair in a grid,
+# without running the qualifier pipeline per pair. The proposed standards of every pair are read off
+# each event's sorted times at once (truncated to the hundredth, as the written standards are), and
+# a TeamAttendanceIndex of the seasons' swims counts each team's athletes under all of them.
+# Returns one row per pair, season and team.
+def get_attendance_sweep(df, current_standards, gold_pcts, silver_pcts, seasons):
+    events, sorted_values = sort_event_times(df)
+    pcts = np.unique(np.concatenate([np.asarray(gold_pcts, dtype='float64'), np.asarray(silver_pcts, dtype='float64')]))
+    quantiles = np.floor(event_quantiles(events, sorted_values, pcts))
+
+    swims = df[df['season'].isin(seasons) & current_standards.contains(df['Event_name'])]
+    index = TeamAttendanceIndex.from_results(swims)
+    rows = pd.Index(events['Event_name'].astype(str)).get_indexer(index.events)
+
+    grid = pd.MultiIndex.from_product([gold_pcts, silver_pcts], names=['gold_pct', 'silver_pct']).to_frame(index=False)
+    gold = quantiles[rows][:, np.searchsorted(pcts, grid['gold_pct'])].T
+    silver = quantiles[rows][:, np.searchsorted(pcts, grid['silver_pct'])].T
+    counts = index.counts(gold, silver)
+
+    sweep_df = grid.loc[np.repeat(grid.index, len(index.groups))].reset_index(drop=True)
+    sweep_df['season'] = np.tile(index.groups.get_level_values('season'), len(grid))
+    sweep_df['team_abbr'] = np.tile(index.groups.get_level_values('team_abbr'), len(grid))
+    for level, level_counts in zip(MEET_RANKING, np.moveaxis(counts, 2, 0)):
+        sweep_df[level] = level_counts.ravel()
+    sweep_df['Total'] = counts.sum(axis=2).ravel()
+    return sweep_df[sweep_df['Total'] > 0].reset_index(drop=True)
+
+# Function to find the percentile each current gold/silver standard sits at within every event.
+# Uses the per-event cumulative-count index (built from df when not supplied) so each lookup is O(1).
+# current_standards is a StandardsTable.
+def get_current_percentile_summary(df, standard, current_standards, index=None):
+    if index is None:
+        index = EventTimeIndex.from_results(add_event_names_column(df[EVENT_COLUMNS + ['converted_hundredths']].copy()))
+
+    events = get_event_names(df)
+    events = events[current_standards.contains(events)]
+    gold = current_standards.times(events, 'gold_y').astype('int64')
+    silver = current_standards.times(events, 'silver_y').astype('int64')
+
     # Create a summary DataFrame
     summary_df = pd.DataFrame({
-        'Event_name': event_names,
-        'current_gold_time': current_gold_times,
-        'current_gold_percentile': current_gold_percentile,
-        'current_silver_time': current_silver_times,
-        'current_silver_percentile': current_silver_percentile
+        'Event_name': events.to_numpy(),
+        'current_gold_time': gold,
+        'current_gold_percentile': index.percentile_ranks(events, gold),
+        'current_silver_time': silver,
+        'current_silver_percentile': index.percentile_ranks(events, silver)
     })
     
     summary_df.to_csv(f'current_percential_analysis.csv', index=False)
 
-def dedup_entries(df):
-    # Define meet ranking order using pd.Categorical
-    df['qualified_meet'] = pd.Categorical(df['qualified_meet'], categories=["GOLD", "SILVER", "BRONZE"], ordered=True)
-
-    # Sort by swimmer, meet priority, and time
-    df_sorted = df.sort_values(by=['athlete_id', 'qualified_meet', 'converted_hundredths'])
-
-    # For each swimmer, keep only the highest-priority meet by dropping duplicates based on swimmer and meet priority order
-    df_highest_priority = (
-            df_sorted[df_sorted.groupby('athlete_id')['qualified_meet'].transform('min') == df_sorted['qualified_meet']]
-        )
-
-    # For each swimmer-meet combination, keep only the top 3 fastest times
-    df_final = pd.concat(
-            [group.sample(n=min(3, len(group)), random_state=1) for _, group in df_highest_priority.groupby(['athlete_id', 'qualified_meet'], observed=False)]
-        ).reset_index(drop=True)
-    
-    return df_final
-def add_event_names(df):
-    # Group by 'age_group', 'distance', and 'stroke' to create unique events
-    grouped = df.groupby(['age_group', 'distance', 'stroke'])
-
-    # Lists to store the results
-    event_names = []
-
-    for name, group in grouped:
-        # Create the event name
-        event_name = f"{name[0]}_{name[1]}_{name[2]}"
-
-        # Store the results
-        event_names.append(event_name)
-
-    # Create a summary DataFrame
-    summary_df = pd.DataFrame({
-        'Event_name': event_names,
-    })
-    df['Event_name'] = event_names
-
-    return 
-    # Use the utility function to add event names to the DataFrame
-    add_event_names_column(df)
-    return
-
-def get_team_attendance_summary(df):
-    summary = (
-        df.groupby(['team_abbr', 'qualified_meet'], observed=False)['athlete_id']
-            .nunique()
-            .unstack(fill_value=0)  # Fill missing values with 0
-        )
-    # Add a "Total" column for each team (row-wise sum)
-    summary['Total'] = summary.sum(axis=1)
+# Function to print one season's attendance table (TeamAttendanceIndex.attendance) with a row of totals
+def get_team_attendance_summary(attendance, season):
+    summary = attendance.xs(season, level='season').copy()
 
     # Add a row of column totals and an overall total
     summary.loc['Total'] = summary.sum()
     print(summary)
 
 
-def get_estimated_meet_duration(df, season, proposed_times, heat_time, event_delay):
-    grouped = df.groupby(['age_group', 'distance', 'stroke'])
-
-    # Lists to store the results
-    event_names = []
-    gold_qualifiers = []
-    gold_heats = []
-    silver_qualifiers = []
-    silver_heats = []
-    bronze_qualifiers = []
-    bronze_heats = []
-    gold_event_times = []
-    silver_event_times = []
-    bronze_event_times = []
-
-    heat_time_hundredths = heat_time * 100
-    event_delay_hundredths = event_delay * 100
-
-    for name, group in grouped:
-        # Create the event name
-        event_name = f"{name[0]}_{name[1]}_{name[2]}"
-        #lookup time standards
-        _row = proposed_times.index[proposed_times['Event_name']==event_name].tolist()
-        _gold = proposed_times.loc[_row, "new_gold_y"]
-        _silver = proposed_times.loc[_row, "new_silver_y"]
-        
-        _gold_hundredths = convert_time_to_hundredths(_gold.item())
-        _silver_hundredths = convert_time_to_hundredths(_silver.item())
-
-        # # Count the number of entries meeting or exceeding the threshold
-        gold_count = (group['qualified_meet'] == "GOLD").sum()
-        silver_count = (group['qualified_meet'] == "SILVER").sum()
-        bronze_count = (group['qualified_meet'] == "BRONZE").sum()
-
-        _gold_heats = math.ceil(gold_count/6)
-        _silver_heats = math.ceil(silver_count/6)
-        _bronze_heats = math.ceil(bronze_count/6)
-
-        print(f'{season} GOLD: Number of heats: {_gold_heats} for {event_name}')
-        # print(f'{season} SILVER: Number of heats: {_silver_heats} for {event_name}')
-        # print(f'{season} BRONZE: Number of heats: {_bronze_heats} for {event_name}')
-
-        # Store the results
-        event_names.append(event_name)
-        gold_qualifiers.append(gold_count)
-        silver_qualifiers.append(silver_count)
-        bronze_qualifiers.append(bronze_count)
-        gold_heats.append(_gold_heats)
-        silver_heats.append(_silver_heats)
-        bronze_heats.append(_bronze_heats)
-        
-
-        # add 15 seconds between heats, 30 seconds between events, add 20 minutes for relays
-        gold_event_times.append(_gold_heats * (_gold_hundredths + heat_time_hundredths) + event_delay_hundredths)
-        silver_event_times.append(_silver_heats * (_silver_hundredths + heat_time_hundredths) + event_delay_hundredths)
-        bronze_event_times.append(_bronze_heats * (_silver_hundredths + heat_time_hundredths) + event_delay_hundredths)
-    
-    # Create a summary DataFrame
-    times_df = pd.DataFrame({
-        'Event_name': event_names,
-        f'gold_qualifiers-{season}' : gold_qualifiers,
-        f'gold_heats-{season}' : gold_heats,
-        f'gold_est_duration-{season}' : gold_event_times,
-        f'silver_qualifiers-{season}' : silver_qualifiers,
-        f'silver_heats-{season}' : silver_heats,
-        f'silver_est_duration-{season}' : silver_event_times,
-        f'bronze_qualifiers-{season}' : bronze_qualifiers,
-        f'bronze_heats-{season}' : bronze_heats,
-        f'bronze_est_duration-{season}' : bronze_event_times
-    })
-
-    return times_df
+# Function to run the qualifier pipeline for every season in df in one grouped pass, without printing
+# or writing files: classify every swim, dedup the entries, and estimate each meet's duration.
+# proposed_standards and current_standards are StandardsTables. Returns the tidy duration table
+# (one row per season, event and level), the per-season meet summary (summarize_meets), the team
+# attendance under the proposed and under the current standards (indexed by (season, team_abbr),
+# one column per meet and a 'Total' column, read off a TeamAttendanceIndex so the current standards
+# need no classify and dedup pass of their own), and the deduped entries under the proposed standards.
+# With simulations set, the meet lengths are also simulated that many times (simulate_meet_durations)
+# and the 50th/90th percentile lengths are added to the summary.
+def run_qualifier_pipeline(df, proposed_standards, current_standards, heat_time, event_time, simulations=0, dedup_policy='fastest', entry_limits=None):
+    if 'season' not in df:
+        df = df.assign(season=get_seasons(df['date']))
 
-def  get_qualifiers_summary(df, proposed_times, current_times, heat_time, event_time):
-    # Group by 'age_group', 'distance', and 'stroke' to create unique events
-    grouped = df.groupby(['age_group', 'distance', 'stroke'])
-    season = df['date'].iloc[0]
-    _dt = datetime.strptime(season, '%m/%d/%y')
-    # Lists to store the results
-    entries = pd.DataFrame()
-    entries_old = pd.DataFrame()
-    
-    # Process each group
-    for name, group in grouped:
-        # Create the event name
-        event_name = f"{name[0]}_{name[1]}_{name[2]}"
-
-        #lookup time standards
-        _row = proposed_times.index[proposed_times['Event_name']==event_name].tolist()
-        _gold = proposed_times.loc[_row, "new_gold_y"]
-        _silver = proposed_times.loc[_row, "new_silver_y"]
-        
-        _gold_hundredths = convert_time_to_hundredths(_gold.item())
-        _silver_hundredths = convert_time_to_hundredths(_silver.item())
-
-        _gold_peeps = group[group['converted_hundredths'] <= _gold_hundredths]
-        _silver_peeps = group[(group['converted_hundredths'] <= _silver_hundredths) & (group['converted_hundredths'] >= _gold_hundredths)]
-        _bronze_peeps = group[group['converted_hundredths'] > _silver_hundredths]
-                
-        _gold_entries = _gold_peeps[_gold_peeps['converted_hundredths'] <= _gold_hundredths].assign(qualified_meet='GOLD')
-        _silver_entries = _silver_peeps[_silver_peeps['converted_hundredths'] <= _silver_hundredths].assign(qualified_meet='SILVER')
-        if "15-18" in event_name:
-            _bronze_entries = _bronze_peeps[_bronze_peeps['converted_hundredths'] > _silver_hundredths].assign(qualified_meet='SILVER')
-        else:
-            _bronze_entries = _bronze_peeps[_bronze_peeps['converted_hundredths'] > _silver_hundredths].assign(qualified_meet='BRONZE')
-
-        entries = pd.concat([entries, _gold_entries], ignore_index=True) 
-        entries = pd.concat([entries, _silver_entries], ignore_index=True) 
-        entries = pd.concat([entries, _bronze_entries], ignore_index=True)  
-
-        #lookup time standards
-        _row = current_times.index[current_times['Event_name']==event_name].tolist()
-        _gold = current_times.loc[_row, "gold_y"]
-        _silver = current_times.loc[_row, "silver_y"]
-        
-        _gold_hundredths = convert_time_to_hundredths(_gold.item())
-        _silver_hundredths = convert_time_to_hundredths(_silver.item())
-
-        _gold_peeps = group[group['converted_hundredths'] <= _gold_hundredths]
-        _silver_peeps = group[(group['converted_hundredths'] <= _silver_hundredths) & (group['converted_hundredths'] >= _gold_hundredths)]
-        _bronze_peeps = group[group['converted_hundredths'] > _silver_hundredths]
-                
-        _gold_entries = _gold_peeps[_gold_peeps['converted_hundredths'] <= _gold_hundredths].assign(qualified_meet='GOLD')
-        _silver_entries = _silver_peeps[_silver_peeps['converted_hundredths'] <= _silver_hundredths].assign(qualified_meet='SILVER')
-        if "15-18" in event_name:
-            _bronze_entries = _bronze_peeps[_bronze_peeps['converted_hundredths'] > _silver_hundredths].assign(qualified_meet='SILVER')
-        else:
-            _bronze_entries = _bronze_peeps[_bronze_peeps['converted_hundredths'] > _silver_hundredths].assign(qualified_meet='BRONZE')
-
-        entries_old = pd.concat([entries_old, _gold_entries], ignore_index=True) 
-        entries_old = pd.concat([entries_old, _silver_entries], ignore_index=True) 
-        entries_old = pd.concat([entries_old, _bronze_entries], ignore_index=True) 
+    # Classify every swim of an event with both proposed and current standards against each
+    swims = df[proposed_standards.contains(df['Event_name']) & current_standards.contains(df['Event_name'])]
+    swims = swims.reset_index(drop=True)
 
+    entries = swims.assign(qualified_meet=classify_meet(swims['converted_hundredths'],
+        proposed_standards.times(swims['Event_name'], 'gold_y'), proposed_standards.times(swims['Event_name'], 'silver_y'), swims['Event_name']))
 
     # pass the entries to a function that will determine meet length
-    cleaned_up_entries = dedup_entries(entries)
-
-    cleaned_up_entries_sorted = cleaned_up_entries.sort_values(by=['athlete_id'])
-    cleaned_up_entries_sorted.drop_duplicates(subset=['athlete_id'], keep='first', inplace=True)
-
-    cleaned_up_entries_old = dedup_entries(entries_old)
-
-    cleaned_up_entries_old_sorted = cleaned_up_entries_old.sort_values(by=['athlete_id'])
-    cleaned_up_entries_old_sorted.drop_duplicates(subset=['athlete_id'], keep='first', inplace=True)
-    
-    
-    number_of_gold_athletes = (cleaned_up_entries_sorted['qualified_meet'] == "GOLD").sum()
-    number_of_silver_athletes = (cleaned_up_entries_sorted['qualified_meet'] == "SILVER").sum()
-    number_of_bronze_athletes = (cleaned_up_entries_sorted['qualified_meet'] == "BRONZE").sum()
-
-    times_df=get_estimated_meet_duration(cleaned_up_entries, _dt.year, proposed_times, heat_time, event_time)
-    times_df.to_csv(f'estimated_meet_times_{_dt.year}.csv', index=False)
-    gold_duration = times_df[f'gold_est_duration-{_dt.year}'].sum() + 12000
-    silver_duration = times_df[f'silver_est_duration-{_dt.year}'].sum() + 24000
-    bronze_duration = times_df[f'bronze_est_duration-{_dt.year}'].sum() + 24000
-    _g_q=times_df[f'gold_qualifiers-{_dt.year}'].sum()
-    _s_q=(times_df[f'silver_qualifiers-{_dt.year}'].sum() / 2)
-    _b_q=(times_df[f'bronze_qualifiers-{_dt.year}'].sum() / 2)
-    
-    print(f'\nEstimated run time for {_dt.year} Gold Meet: {convert_hundredths_to_time(gold_duration)} ({_g_q} entries, {number_of_gold_athletes} athletes)')
-    print(f'Estimated run time for each {_dt.year} Silver Meet: {convert_hundredths_to_time(silver_duration / 2)} ({_s_q} entries per meet, {number_of_silver_athletes} athletes total)')
-    print(f'Estimated run time for each {_dt.year} Bronze Meet: {convert_hundredths_to_time(bronze_duration / 2)} ({_b_q} entries per meet, {number_of_bronze_athletes} athletes total)')
-    print('\n')
-    get_team_attendance_summary(cleaned_up_entries_sorted)
-    print('\n Compared to the meet summaries from the current time standards:')
-    get_team_attendance_summary(cleaned_up_entries_old_sorted)
-    return times_df, _dt.year
+    cleaned_up_entries = dedup_entries(entries, dedup_policy, entry_limits=entry_limits)
+
+    durations = estimate_meet_durations(cleaned_up_entries, proposed_standards, heat_time, event_time)
+    meets = summarize_meets(durations, cleaned_up_entries)
+
+    if simulations:
+        simulated = simulate_meet_durations(cleaned_up_entries, heat_time, event_time, replicates=simulations,
+                                            percentiles=(50, 90), seed=1)
+        for level in [GOLD, SILVER, BRONZE]:
+            name = level.lower()
+            level_rows = simulated[simulated['qualified_meet'] == level].set_index('season')
+            for pct in ['p50', 'p90']:
+                meets[f'{name}_duration_{pct}'] = ((level_rows[pct] + RELAY_TIME[name]) / MEETS_PER_LEVEL[name]).reindex(meets['season']).to_numpy()
+
+    attendance_index = TeamAttendanceIndex.from_results(swims)
+    return durations, meets, attendance_index.attendance(proposed_standards), attendance_index.attendance(current_standards), cleaned_up_entries
+
+# Function to analyze every season in df in one pass, printing each season's meets and team attendance
+# and writing estimated_meet_times_<season>.csv. Returns the wide duration table of every season, the
+# per-season meet summary and the deduped entries (for seed_heats). With a StageCache (for the inputs df was loaded from), the pipeline's
+# results are reused from an earlier run with the same standards, seasons and options.
+def  get_qualifiers_summary(df, proposed_standards, current_standards, heat_time, event_time, simulations=0, dedup_policy='fastest', cache=None, entry_limits=None):
+    cache = cache or StageCache(None, enabled=False)
+    params = {'standards': proposed_standards.to_frame().to_dict('list'), 'seasons': sorted(int(season) for season in df['season'].unique()),
+              'heat_time': heat_time, 'event_time': event_time, 'simulations': simulations, 'dedup_policy': dedup_policy, 'entry_limits': entry_limits}
+    durations, meets, attendance, attendance_old, entries = cache.memoize('qualifier pipeline', params, lambda: run_qualifier_pipeline(
+        df, proposed_standards, current_standards, heat_time, event_time, simulations, dedup_policy, entry_limits))
+
+    times = {}
+    for meet in meets.to_dict('records'):
+        year = meet['season']
+        times[year] = widen_meet_durations(durations, entries, year)
+        times[year].to_csv(f'estimated_meet_times_{year}.csv', index=False)
+
+        print(f'\nEstimated run time for {year} Gold Meet: {convert_hundredths_to_time(meet["gold_duration"])} ({meet["gold_entries"]} entries, {meet["gold_athletes"]} athletes)')
+        print(f'Estimated run time for each {year} Silver Meet: {convert_hundredths_to_time(meet["silver_duration"])} ({meet["silver_entries"]} entries per meet, {meet["silver_athletes"]} athletes total)')
+        print(f'Estimated run time for each {year} Bronze Meet: {convert_hundredths_to_time(meet["bronze_duration"])} ({meet["bronze_entries"]} entries per meet, {meet["bronze_athletes"]} athletes total)')
+        if simulations:
+            print(f'Across {simulations} simulated meets, the median and 90th percentile run times are:')
+            for level in ['gold', 'silver', 'bronze']:
+                print(f'  {level.capitalize()}: {convert_hundredths_to_time(meet[f"{level}_duration_p50"])} / {convert_hundredths_to_time(meet[f"{level}_duration_p90"])}')
+        print('\n')
+        get_team_attendance_summary(attendance, year)
+        print('\n Compared to the meet summaries from the current time standards:')
+        get_team_attendance_summary(attendance_old, year)
+    return times, meets, entries
 
 def get_new_time_diffs(df):
-    df['gold_new_hund_y'] = df['new_gold_y'].apply(lambda x: convert_time_to_hundredths(x))
-    df['gold_new_hund_s'] = df['new_gold_s'].apply(lambda x: convert_time_to_hundredths(x))
-    df['gold_hund_s'] = df['gold_s'].apply(lambda x: convert_time_to_hundredths(x))
-    df['gold_hund_y'] = df['gold_y'].apply(lambda x: convert_time_to_hundredths(x))
-    df['silver_new_hund_y'] = df['new_silver_y'].apply(lambda x: convert_time_to_hundredths(x))
-    df['silver_new_hund_s'] = df['new_silver_s'].apply(lambda x: convert_time_to_hundredths(x))
-    df['silver_hund_s'] = df['silver_s'].apply(lambda x: convert_time_to_hundredths(x))
-    df['silver_hund_y'] = df['silver_y'].apply(lambda x: convert_time_to_hundredths(x))
-
-    df['gold_diff_y_hund'] = df['gold_new_hund_y'] - df['gold_hund_y']
-    df['gold_diff_s_hund'] = df['gold_new_hund_s'] - df['gold_hund_s']
-    df['silver_diff_y_hund'] = df['silver_new_hund_y'] - df['silver_hund_y']
-    df['silver_diff_s_hund'] = df['silver_new_hund_s'] - df['silver_hund_s']
-
-    df['gold_diff_y'] = df['gold_diff_y_hund'].apply(lambda x: convert_hundredths_to_time(x))
-    df['gold_diff_s'] = df['gold_diff_s_hund'].apply(lambda x: convert_hundredths_to_time(x))
-    df['silver_diff_y'] = df['silver_diff_y_hund'].apply(lambda x: convert_hundredths_to_time(x))
-    df['silver_diff_s'] = df['silver_diff_s_hund'].apply(lambda x: convert_hundredths_to_time(x))
+    hundredths = {}
+    for column in ['new_gold_y', 'new_gold_s', 'gold_y', 'gold_s', 'new_silver_y', 'new_silver_s', 'silver_y', 'silver_s']:
+        hundredths[column], malformed = convert_times_to_hundredths(df[column])
+        report_malformed_times(column, df[column], malformed)
 
-    
+    df['gold_diff_y_hund'] = hundredths['new_gold_y'] - hundredths['gold_y']
+    df['gold_diff_s_hund'] = hundredths['new_gold_s'] - hundredths['gold_s']
+    df['silver_diff_y_hund'] = hundredths['new_silver_y'] - hundredths['silver_y']
+    df['silver_diff_s_hund'] = hundredths['new_silver_s'] - hundredths['silver_s']
+
+    df['gold_diff_y'] = convert_hundredths_to_times(df['gold_diff_y_hund'])
+    df['gold_diff_s'] = convert_hundredths_to_times(df['gold_diff_s_hund'])
+    df['silver_diff_y'] = convert_hundredths_to_times(df['silver_diff_y_hund'])
+    df['silver_diff_s'] = convert_hundredths_to_times(df['silver_diff_s_hund'])
 
-    df = df.drop(['gold_new_hund_y', 'gold_new_hund_s', 'gold_hund_y', 'gold_hund_s', 'silver_new_hund_y', 'silver_new_hund_s', 'silver_hund_y', 'silver_hund_s'], axis=1)
     return df
 
 def clear_teen_event(row, col):
@@ -482,46 +213,266 @@ def clean_up_events(df):
 
     return df
 
+# Dataset (and stage cache) shared by every scenario run in a worker process, set once per worker
+_scenario_data = {}
+
+def _init_scenario_worker(df, current_standards, cache=None):
+    _scenario_data['df'] = df
+    _scenario_data['current_standards'] = current_standards
+    _scenario_data['cache'] = cache or StageCache(None, enabled=False)
+
+# Function to run every season, heat time and event delay for one (gold_pct, silver_pct) pair.
+# The proposed standards are computed once per pair and all seasons are analyzed in one pass per
+# heat time and event delay; returns one summary row per combination. A pair already run with the
+# same inputs and options is read from the stage cache.
+def run_scenario(gold_pct, silver_pct, heat_times, event_times, seasons, simulations=0, dedup_policy='fastest', entry_limits=None):
+    params = {'gold_pct': gold_pct, 'silver_pct': silver_pct, 'heat_times': list(heat_times), 'event_times': list(event_times),
+              'seasons': list(seasons), 'simulations': simulations, 'dedup_policy': dedup_policy, 'entry_limits': entry_limits}
+    return _scenario_data['cache'].memoize('scenario', params, lambda: _run_scenario(
+        gold_pct, silver_pct, heat_times, event_times, seasons, simulations, dedup_policy, entry_limits))
+
+def _run_scenario(gold_pct, silver_pct, heat_times, event_times, seasons, simulations, dedup_policy, entry_limits):
+    df = _scenario_data['df']
+    current_standards = _scenario_data['current_standards']
+    combined, _ = get_proposed_standards(df, current_standards, gold_pct, silver_pct)
+    proposed_standards = StandardsTable.from_proposed(combined)
+
+    seasons_df = df[df['season'].isin(seasons)]
+    rows = []
+    for heat_time in heat_times:
+        for event_time in event_times:
+            _, meets, _, _, _ = run_qualifier_pipeline(seasons_df, proposed_standards, current_standards, heat_time, event_time, simulations, dedup_policy, entry_limits)
+            rows.extend({'gold_pct': gold_pct, 'silver_pct': silver_pct, 'heat_time': heat_time, 'event_time': event_time, **meet}
+                        for meet in meets.to_dict('records'))
+    # one block of rows per season, as listed
+    return sorted(rows, key=lambda row: list(seasons).index(row['season']))
+
+# Function to run the full pipeline for every combination of percentiles, heat and event delays
+# and seasons on a process pool. Each worker receives the loaded dataset (and the stage cache) once.
+# Returns one consolidated DataFrame with a row per combination.
+def run_scenario_grid(df, current_standards, gold_pcts, silver_pcts, heat_times, event_times, seasons, workers=None, simulations=0, dedup_policy='fastest', cache=None, entry_limits=None):
+    pairs = [(gold_pct, silver_pct) for gold_pct in gold_pcts for silver_pct in silver_pcts]
+    workers = min(len(pairs), workers or os.cpu_count() or 1)
+
+    if workers <= 1:
+        _init_scenario_worker(df, current_standards, cache)
+        results = [run_scenario(gold_pct, silver_pct, heat_times, event_times, seasons, simulations, dedup_policy, entry_limits) for gold_pct, silver_pct in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_scenario_worker, initargs=(df, current_standards, cache)) as executor:
+            futures = [executor.submit(run_scenario, gold_pct, silver_pct, heat_times, event_times, seasons, simulations, dedup_policy, entry_limits) for gold_pct, silver_pct in pairs]
+            results = [future.result() for future in futures]
+
+    results_df = pd.DataFrame([row for rows in results for row in rows])
+    for level in ['gold', 'silver', 'bronze']:
+        results_df[f'{level}_duration_time'] = convert_hundredths_to_times(results_df[f'{level}_duration'])
+    return results_df
+
+# Function to run the scenario grid from the parsed command line options and write the results table
+def run_batch(options, profiler=None):
+    profiler = profiler or StageProfiler(enabled=False)
+    cache = StageCache(input_fingerprint(options.files), enabled=not options.recompute)
+    df = load_results(options.files, profiler)
+    with profiler.stage('current standards') as stage:
+        current_standards = load_current_standards()
+        stage['rows'] = len(current_standards)
+    seasons = select_seasons(df, options)
+
+    with profiler.stage('scenario grid') as stage:
+        results_df = run_scenario_grid(df, current_standards, options.gold_pct, options.silver_pct,
+                                       options.heat_time, options.event_time, seasons, options.workers, options.simulations, options.dedup_policy, cache, get_entry_limits(options))
+        stage['rows'] = len(results_df)
+    results_df.to_csv(options.output, index=False)
+    print(f'{len(results_df)} scenarios written to: {options.output}')
+
+    if options.attendance_output:
+        with profiler.stage('attendance sweep') as stage:
+            attendance_df = get_attendance_sweep(df, current_standards, options.gold_pct, options.silver_pct, seasons)
+            stage['rows'] = len(attendance_df)
+        attendance_df.to_csv(options.attendance_output, index=False)
+        print(f'Team attendance for every percentile pair written to: {options.attendance_output}')
+
+    if options.sweep_output:
+        with profiler.stage('percentile sweep') as stage:
+            sweep_df = get_percentile_sweep(df, options.gold_pct, options.silver_pct)
+            stage['rows'] = len(sweep_df)
+        sweep_df.to_csv(options.sweep_output, index=False)
+        print(f'Proposed standards for every percentile pair written to: {options.sweep_output}')
+
+# Function to read a --config JSON file as parser defaults, checked the way the command line is:
+# a single value is accepted for options that take a list, and every value goes through the
+# option's type and choices. Exits with a usage error for unknown options and invalid values.
+def read_config(parser, path):
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        parser.error(f'{path} must hold a JSON object of options')
+
+    actions = {action.dest: action for action in parser._actions if action.dest not in ('help', 'config')}
+    defaults = {}
+    for key, value in config.items():
+        dest = key.replace('-', '_')
+        action = actions.get(dest)
+        if action is None:
+            parser.error(f'unknown option in {path}: {key}')
+        # flags such as all_seasons and recompute
+        if action.nargs == 0:
+            if not isinstance(value, bool):
+                parser.error(f'{key} in {path} must be true or false')
+            defaults[dest] = value
+            continue
+
+        takes_list = action.nargs in ('+', '*') or isinstance(action.nargs, int)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(action.nargs, int) and len(values) != action.nargs:
+            parser.error(f'{key} in {path} takes a list of {action.nargs} values')
+        if (isinstance(value, list) and not takes_list) or not values:
+            parser.error(f'{key} in {path} takes {"one or more values" if takes_list else "a single value"}')
+        checked = []
+        for item in values:
+            try:
+                # read each value as the command line would read it, so a season of 2024.5 is rejected, not truncated
+                if isinstance(item, (bool, list, dict)) or item is None:
+                    raise ValueError
+                item = action.type(str(item)) if action.type else item
+            except (TypeError, ValueError):
+                parser.error(f'invalid {key} in {path}: {item!r}')
+            if action.choices is not None and item not in action.choices:
+                parser.error(f'invalid {key} in {path}: {item!r} (choose from {", ".join(map(str, action.choices))})')
+            checked.append(item)
+        defaults[dest] = checked if takes_list else checked[0]
+    return defaults
+
+# Function to return the per-meet entry limits given with --entry-limits (as a MEET_ENTRY_LIMITS-style
+# dict), or None to use MEET_ENTRY_LIMITS
+def get_entry_limits(options):
+    return dict(zip(MEET_RANKING, options.entry_limits)) if options.entry_limits else None
+
+# Function to check that every Gold percentile is below every Silver percentile, all strictly between 0 and 1
+def valid_percentiles(gold_pcts, silver_pcts):
+    return 0 < min(gold_pcts) and max(gold_pcts) < min(silver_pcts) and max(silver_pcts) < 1
+
+# Function to exit with a usage error when any of the given options was set, e.g. '--lanes only applies with --heat-sheets'
+def reject_options(parser, options, dests, condition):
+    given = [f'--{dest.replace("_", "-")}' for dest in dests if getattr(options, dest) not in (None, False)]
+    if given:
+        parser.error(f'{", ".join(given)} only {"apply" if len(given) > 1 else "applies"} {condition}')
+
+# Function to pick the seasons to analyze (the latest unless --season or --all-seasons says otherwise),
+# warning about requested seasons that have no results. Exits when none of them has any.
+def select_seasons(df, options):
+    available = sorted(int(season) for season in df['season'].unique())
+    if options.all_seasons:
+        return available
+    seasons = options.season or available[-1:]
+    missing = [season for season in seasons if season not in available]
+    if missing:
+        print(f'Warning: no results for season(s) {", ".join(map(str, missing))}; the results files cover {", ".join(map(str, available))}')
+    seasons = [season for season in seasons if season in available]
+    if not seasons:
+        raise SystemExit('None of the requested seasons has results, nothing to analyze.')
+    return seasons
+
 def main():
-    # Adjust the file path pattern as needed (e.g., '*.csv' for all CSV files in the directory)
-    file_path_pattern = './gasl*.csv'
+    parser = argparse.ArgumentParser(__file__)
+
+    parser.add_argument("--config", default=None, help="JSON file providing any of the options below (implies --batch)")
+    parser.add_argument("--batch", action="store_true", help="Run every combination of the options below without prompting")
+    parser.add_argument("--files", default='./gasl*.csv', help="Results file pattern (default: ./gasl*.csv)")
+    parser.add_argument("--gold-pct", type=float, nargs='+', default=None, help=f"Percentiles for the Gold Meet Standard (default: prompt, or {DEFAULT_GOLD_PERCENTILE} with --batch)")
+    parser.add_argument("--silver-pct", type=float, nargs='+', default=None, help=f"Percentiles for the Silver Meet Standard (default: prompt, or {DEFAULT_SILVER_PERCENTILE} with --batch)")
+    parser.add_argument("--heat-time", type=int, nargs='+', default=None, help=f"Seconds between heats (default: prompt, or {DEFAULT_HEAT_TIME_SECONDS} with --batch)")
+    parser.add_argument("--event-time", type=int, nargs='+', default=None, help=f"Seconds between events (default: prompt, or {DEFAULT_EVENT_TIME_SECONDS} with --batch)")
+    parser.add_argument("--season", type=int, nargs='+', default=None, help="Seasons to analyze (default: latest)")
+    parser.add_argument("--all-seasons", action="store_true", help="Analyze every season in the results files")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--simulations", type=int, default=0, help="Also simulate each meet this many times (Monte Carlo) and report percentile run times")
+    parser.add_argument("--dedup-policy", choices=['fastest', 'meet_entry_limit', 'random'], default='fastest', help="How each athlete's entries are picked (default: fastest)")
+    parser.add_argument("--entry-limits", type=int, nargs=3, default=None, metavar=('GOLD', 'SILVER', 'BRONZE'), help="Events each athlete may swim at the Gold, Silver and Bronze Meets with --dedup-policy meet_entry_limit (default: MEET_ENTRY_LIMITS in constants.py)")
+    parser.add_argument("--output", default=None, help="Consolidated results file with --batch (default: scenario_results.csv)")
+    parser.add_argument("--attendance-output", default=None, help="With --batch, also write each team's athletes at each meet for every percentile pair to this file")
+    parser.add_argument("--sweep-output", default=None, help="With --batch, also write the proposed standards of every event for every percentile pair to this file")
+    parser.add_argument("--profile", action="store_true", help=f"Record time, CPU and memory for each stage in {PROFILE_FILE}")
+    parser.add_argument("--bootstrap", type=int, default=None, help="Without --batch, also resample the results this many times and write confidence bands for every proposed standard")
+    parser.add_argument("--bootstrap-by", choices=['swim', 'athlete'], default=None, help="Resample individual swims or whole athletes (default: swim)")
+    parser.add_argument("--heat-sheets", action="store_true", help="Without --batch, also seed every event into heats and lanes and write heat sheets and meet timelines")
+    parser.add_argument("--lanes", type=int, default=None, help=f"Lanes used for the heat sheets (default: {DEFAULT_LANES})")
+    parser.add_argument("--recompute", action="store_true", help="Recompute every stage instead of reusing results cached by earlier runs with the same inputs")
+    parser.add_argument("--confidence", type=float, default=None, help=f"Confidence level of the bootstrap bands (default: {DEFAULT_CONFIDENCE})")
+
+    options = parser.parse_args()
+    if options.config:
+        # config values become defaults, so explicit command line options still win
+        parser.set_defaults(**read_config(parser, options.config))
+        options = parser.parse_args()
+        options.batch = True
+    if options.entry_limits and options.dedup_policy != 'meet_entry_limit':
+        parser.error('--entry-limits only applies with --dedup-policy meet_entry_limit')
+    if options.entry_limits and min(options.entry_limits) < 1:
+        parser.error('--entry-limits must allow at least one event at every meet')
+    if options.batch:
+        reject_options(parser, options, INTERACTIVE_OPTIONS, 'without --batch')
+    else:
+        reject_options(parser, options, [dest for dest in BATCH_OPTIONS if dest not in PROMPTED_OPTIONS], 'with --batch')
+        for dest in PROMPTED_OPTIONS:
+            if getattr(options, dest) and len(getattr(options, dest)) > 1:
+                parser.error(f'--{dest.replace("_", "-")} takes a single value without --batch')
+        if not options.heat_sheets:
+            reject_options(parser, options, ['lanes'], 'with --heat-sheets')
+        if not options.bootstrap:
+            reject_options(parser, options, ['bootstrap_by', 'confidence'], 'with --bootstrap')
+    # fill in the defaults of the options this mode uses
+    for dest, default in (BATCH_OPTIONS if options.batch else INTERACTIVE_OPTIONS).items():
+        if getattr(options, dest) is None:
+            setattr(options, dest, default)
+    if options.lanes is not None and options.lanes < 1:
+        parser.error('--lanes must be at least 1')
+    # batch mode always has both lists here; interactive mode checks prompted values after the prompts
+    if options.gold_pct and options.silver_pct and not valid_percentiles(options.gold_pct, options.silver_pct):
+        parser.error('every --gold-pct must be below every --silver-pct, all between 0 and 1 (e.g. --gold-pct .15 --silver-pct .55)')
+
+    profiler = StageProfiler(enabled=options.profile)
+    if options.batch:
+        run_batch(options, profiler)
+        profiler.write(os.path.join(os.path.dirname(options.output), PROFILE_FILE), mode='batch', options=vars(options))
+        return
+
+    file_path_pattern = options.files
+    # stage results of earlier runs on the same results and standards files are reused
+    cache = StageCache(input_fingerprint(file_path_pattern), enabled=not options.recompute)
     
-    # Read the CSV files
-    df = read_csv_files(file_path_pattern)
-
-    # add a column that can be an athlete identifier
-    df['athlete_id'] = df.apply(lambda row: hashlib.sha256(f"{row['first_name']}_{row['last_name']}_{row['team_abbr']}_{row['age']}".encode()).hexdigest(), axis=1)
+    # Read the CSV files (typed and converted, through the ingest cache)
+    df = load_results(file_path_pattern, profiler)
+    # analyze the latest season unless other seasons were asked for, all from the frame loaded above
+    seasons = select_seasons(df, options)
 
     # Get the current standards, generate event_names
-    current_standards = read_csv_files('./current_standards.csv')
-    current_standards = add_event_names_column(current_standards)
-    current_standards = current_standards.drop(['age_group', 'distance', 'stroke'], axis=1)
-    
-    # get input for percentials
-    gold_pct = float(input('Enter percentile for Gold Meet Standard (default: .15): ').strip() or ".15")
-    silver_pct = float(input('Enter percentile for Silver Meet Standard (default: .55): ').strip() or ".55")
-    heat_time = int(input('To estimate meet length, enter the number of seconds between heats (default: 15): ').strip() or "15")
-    event_time = int(input('To estimate meet length, enter the number of seconds between events (default: 30): ').strip() or "30")
-
-    standards = {
-        "gold": gold_pct,
-        "silver" : silver_pct
-    }
+    with profiler.stage('current standards') as stage:
+        current_standards = load_current_standards()
+        stage['rows'] = len(current_standards)
     
-    summary = []
-    for standard, pct in standards.items():
-        # Get the percentile summary
-        summary_df = get_percentile_summary(df, standard, pct)
-        summary.append(summary_df)
-
-    
-    combined=reduce(lambda x, y: pd.merge(x, y, on = 'Event_name'), summary)
-    
-    add_current = combined.merge(current_standards, on = "Event_name")
-    proposed_with_differences = get_new_time_diffs(add_current)
-
-    # show current percentile of current time standards for each event
-    get_current_percentile_summary(df, standard, add_current)
+    # get input for percentials, prompting only for the values not given on the command line
+    gold_pct = options.gold_pct[0] if options.gold_pct else float(input('Enter percentile for Gold Meet Standard (default: .15): ').strip() or ".15")
+    silver_pct = options.silver_pct[0] if options.silver_pct else float(input('Enter percentile for Silver Meet Standard (default: .55): ').strip() or ".55")
+    if not valid_percentiles([gold_pct], [silver_pct]):
+        raise SystemExit(f'The Gold percentile ({gold_pct}) must be below the Silver percentile ({silver_pct}), both between 0 and 1.')
+    heat_time = options.heat_time[0] if options.heat_time else int(input('To estimate meet length, enter the number of seconds between heats (default: 15): ').strip() or "15")
+    event_time = options.event_time[0] if options.event_time else int(input('To estimate meet length, enter the number of seconds between events (default: 30): ').strip() or "30")
+
+    def percentile_summary():
+        combined, add_current = get_proposed_standards(df, current_standards, gold_pct, silver_pct)
+        return combined, get_new_time_diffs(add_current)
+
+    with profiler.stage('percentile summary') as stage:
+        combined, proposed_with_differences = cache.memoize('percentile summary', {'gold_pct': gold_pct, 'silver_pct': silver_pct}, percentile_summary)
+        proposed_standards = StandardsTable.from_proposed(combined)
+        stage['rows'], stage['cached'] = len(combined), cache.last_hit
+
+    # show current percentile of current time standards for each event, and keep the index for close_to_pin
+    with profiler.stage('current percentile summary') as stage:
+        time_index = cache.memoize('event time index', {}, lambda: EventTimeIndex.from_results(df))
+        time_index.save(EVENT_INDEX_FILE)
+        get_current_percentile_summary(df, 'silver', current_standards, time_index)
+        stage['rows'], stage['cached'] = len(time_index.events), cache.last_hit
     # df.to_csv('all_swims.csv', index=False)
     # remove any proposed times for silver 15-18 events
     proposed_with_differences = clean_up_events(proposed_with_differences)
@@ -584,19 +535,51 @@ def main():
         f.write('end tell\n')
         f.write('end tell\n')
 
-    print(f'\n\nBased on the newly calculated time standards with the top {gold_pct:.0%} for Gold and top {silver_pct:.0%} for silver, lets estimate how long each meet would take (using last season data):')
-    # look at all of the gasl times, print out summary based on current season
-    for csv in glob.glob(file_path_pattern):
-        times = pd.read_csv(csv)
-        _season = times['date'].iloc[0]
-        _dt = datetime.strptime(_season, '%m/%d/%y')
-        # add a column that can be an athlete identifier
-        if _dt.year == 2024: #datetime.now().year:
-            times['athlete_id'] = times.apply(lambda row: hashlib.sha256(f"{row['first_name']}_{row['last_name']}_{row['team_abbr']}_{row['age']}".encode()).hexdigest(), axis=1)
-            qualifiers, season = get_qualifiers_summary(times, combined, add_current, heat_time, event_time)
-            qualifiers.to_csv(f'{season}-qualifiers.csv', index=False)
+    season_data = 'last season data' if len(seasons) == 1 and seasons[0] == df['season'].max() else f'data from {", ".join(map(str, seasons))}'
+    print(f'\n\nBased on the newly calculated time standards with the top {gold_pct:.0%} for Gold and top {silver_pct:.0%} for silver, lets estimate how long each meet would take (using {season_data}):')
+    with profiler.stage('qualifiers summary') as stage:
+        seasons_df = df[df['season'].isin(seasons)]
+        qualifiers, meets, entries = get_qualifiers_summary(seasons_df, proposed_standards, current_standards, heat_time, event_time, options.simulations, options.dedup_policy, cache, get_entry_limits(options))
+        for season, times_df in qualifiers.items():
+            times_df.to_csv(f'{season}-qualifiers.csv', index=False)
+        if len(seasons) > 1:
+            meets.to_csv(SEASON_SUMMARY_FILE, index=False)
+            print(f'\nSeason by season meet summary written to: {SEASON_SUMMARY_FILE}')
+        stage['rows'], stage['cached'] = len(seasons_df), cache.last_hit
     
+    if options.heat_sheets:
+        with profiler.stage('heat sheets') as stage:
+            seeded = seed_heats(entries, options.lanes)
+            heats = heat_timeline(seeded, heat_time, event_time)
+            event_timeline, sessions = event_and_session_timelines(heats, event_time)
+            seeded['seed_time'] = convert_hundredths_to_times(seeded['converted_hundredths'])
+            for season in seasons:
+                seeded.loc[seeded['season'] == season, HEAT_SHEET_COLUMNS].to_csv(f'heat_sheet_{season}.csv', index=False)
+                event_timeline[event_timeline['season'] == season].to_csv(f'meet_timeline_{season}.csv', index=False)
+            stage['rows'] = len(seeded)
+        print(f'\nSeeded {len(seeded)} entries into {len(heats)} heats of {options.lanes} lanes (heat_sheet_<season>.csv, meet_timeline_<season>.csv).')
+        print('Each Silver and Bronze Meet is seeded on its own, with its own event delays and partial heats, so it runs longer than half the level estimated above:')
+        for session in sessions.to_dict('records'):
+            level = session["qualified_meet"]
+            meet = f' Meet {session["meet"]} of {MEETS_PER_LEVEL[level.lower()]}' if MEETS_PER_LEVEL[level.lower()] > 1 else ' Meet'
+            print(f'  {session["season"]} {level.capitalize()}{meet}: {session["events"]} events, {session["heats"]} heats, {session["swimmers"]} entries, finishes at {session["end_time"]} (before relays)')
+
     print(f'\nCalulated times file written to: ./proposed_new_standards_{gold_pct}_{silver_pct}.csv')
+
+    if options.bootstrap:
+        with profiler.stage('bootstrap') as stage:
+            bootstrap_df = get_bootstrap_summary(df, gold_pct, silver_pct, options.bootstrap, options.confidence,
+                                                 options.bootstrap_by, options.workers)
+            stage['rows'] = len(bootstrap_df)
+        bootstrap_file = f'proposed_standards_bootstrap_{gold_pct}_{silver_pct}.csv'
+        bootstrap_df.sort_values(by=['GASL_Event_ID']).to_csv(bootstrap_file, index=False)
+        widest = bootstrap_df.nlargest(5, 'gold_band_hundredths')
+        print(f'\n{options.confidence:.0%} bootstrap bands ({options.bootstrap} resamples by {options.bootstrap_by}) written to: ./{bootstrap_file}')
+        print('Least certain gold standards:')
+        for row in widest.to_dict('records'):
+            print(f'  {row["Event_name"]}: {row["new_gold_y"]} ({row["gold_y_low"]} to {row["gold_y_high"]}, {row["swims"]} swims)')
+    profiler.write(PROFILE_FILE, mode='interactive', options=vars(options),
+                   inputs={'gold_pct': gold_pct, 'silver_pct': silver_pct, 'heat_time': heat_time, 'event_time': event_time})
 # Main execution
 if __name__ == "__main__":
     main()
\ No newline at end of file
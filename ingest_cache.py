@@ -0,0 +1,117 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from constants import CACHE_DIR
+from utils import read_results_csv, prepare_results, concat_frames, add_athlete_ids, get_seasons
+from profiling import StageProfiler
+
+# Bump when the on-disk layout or prepare_results changes so old entries are rebuilt
+CACHE_VERSION = 3
+
+
+# Identity of a source file: cached entries are only reused while all of these still match
+def _source_stamp(file):
+    stat = os.stat(file)
+    return {
+        'path': os.path.abspath(file),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'version': CACHE_VERSION,
+    }
+
+
+# Every source file gets one cache directory, so a changed file replaces its stale entry
+def _cache_path(file, cache_dir):
+    key = hashlib.sha1(os.path.abspath(file).encode()).hexdigest()
+    return os.path.join(cache_dir, 'ingest', key)
+
+
+# Write a typed DataFrame as one .npy file per column (category columns as codes + categories)
+def _write_frame(df, path, stamp):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for position, (name, column) in enumerate(df.items()):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp_path, f'{position}.codes.npy'), column.cat.codes.to_numpy())
+            np.save(os.path.join(tmp_path, f'{position}.categories.npy'), column.cat.categories.to_numpy(dtype=str))
+            columns.append({'name': name, 'kind': 'category', 'ordered': bool(column.cat.ordered)})
+        else:
+            np.save(os.path.join(tmp_path, f'{position}.npy'), column.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric'})
+
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump({'stamp': stamp, 'rows': len(df), 'columns': columns}, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+# Load a cached frame; no CSV parsing or time conversion is needed
+def _read_frame(path, meta):
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        if column['kind'] == 'category':
+            codes = np.load(os.path.join(path, f'{position}.codes.npy'))
+            categories = np.load(os.path.join(path, f'{position}.categories.npy'))
+            data[column['name']] = pd.Categorical.from_codes(codes, categories, ordered=column['ordered'])
+        else:
+            data[column['name']] = np.load(os.path.join(path, f'{position}.npy'))
+    return pd.DataFrame(data)
+
+
+# Function to read one gasl results CSV, typed and converted, through the on-disk cache.
+# The cache entry is keyed on the file's path, size and mtime, so edits invalidate it automatically.
+def read_results_file(file, cache_dir=CACHE_DIR):
+    path = _cache_path(file, cache_dir)
+    stamp = _source_stamp(file)
+
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['stamp'] == stamp:
+            return _read_frame(path, meta)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    df = prepare_results(read_results_csv(file))
+    try:
+        _write_frame(df, path, stamp)
+    except OSError as e:
+        print(f'Unable to cache {file}: {e}')
+    return df
+
+
+# Function to read every gasl results CSV matching a pattern through the cache and combine them.
+# Files are read in parallel on a process pool (one file per task) and concatenated once at the end.
+def read_results_files(file_path_pattern, cache_dir=CACHE_DIR, workers=None):
+    files = sorted(glob.glob(file_path_pattern))
+    workers = min(len(files), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return concat_frames([read_results_file(file, cache_dir) for file in files])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(read_results_file, files, [cache_dir] * len(files)))
+    return concat_frames(frames)
+
+
+# Function to load the results history once: typed (through the ingest cache), with athlete ids and seasons
+def load_results(file_path_pattern, profiler=None):
+    profiler = profiler or StageProfiler(enabled=False)
+    with profiler.stage('read results') as stage:
+        df = read_results_files(file_path_pattern)
+        stage['rows'] = len(df)
+
+    with profiler.stage('athlete ids') as stage:
+        # add a column that can be an athlete identifier
+        df = add_athlete_ids(df)
+        df['season'] = get_seasons(df['date'])
+        stage['rows'] = int(df['athlete_id'].max()) + 1 if len(df) else 0
+    return df
@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+from constants import GOLD, SILVER, BRONZE, MEET_RANKING, MEETS_PER_LEVEL, DEFAULT_ENTRY_LIMIT, MEET_ENTRY_LIMITS, DEFAULT_LANES, BRONZE_HEAT_PERCENTILE
+from utils import add_event_names_column
+from percentiles import get_event_names
+
+# Largest number of simulated swims held in memory at once (replicates x entries)
+SIMULATION_BATCH_SWIMS = 5000000
+
+
+# Every (season, event, level) in the entries, including levels nobody qualified for,
+# with its number of qualifiers
+def _level_counts(entries):
+    counts = entries.groupby(['season', 'Event_name', 'qualified_meet'], observed=True).size()
+    events = entries[['season', 'Event_name']].drop_duplicates()
+    grid = events.merge(pd.DataFrame({'qualified_meet': MEET_RANKING}), how='cross')
+    grid['qualifiers'] = counts.reindex(pd.MultiIndex.from_frame(grid), fill_value=0).to_numpy()
+    return grid
+
+
+# Give entries the 'Event_name' and 'season' columns the duration engine groups on
+def _prepare_entries(entries, season=None):
+    entries = entries.copy()
+    if 'Event_name' not in entries:
+        entries = add_event_names_column(entries)
+    entries['qualified_meet'] = entries['qualified_meet'].astype(str)
+    if season is not None or 'season' not in entries:
+        entries['season'] = season
+    return entries
+
+
+# Function to estimate the duration of every event at every level for every season in one pass.
+# standards is a StandardsTable (the yard gold and silver times are used). A heat lasts as long as
+# its level's standard (the slowest time that can qualify); bronze has no standard, so bronze
+# heats use the BRONZE_HEAT_PERCENTILE time of that event's bronze entrants.
+# Returns one row per (season, event, level) with qualifiers, heats and est_duration in hundredths.
+def estimate_meet_durations(entries, standards, heat_time, event_delay, lanes=DEFAULT_LANES, season=None):
+    entries = _prepare_entries(entries, season)
+    durations = _level_counts(entries)
+
+    bronze_times = (
+        entries[entries['qualified_meet'] == BRONZE]
+            .groupby(['season', 'Event_name'], observed=True)['converted_hundredths']
+            .quantile(BRONZE_HEAT_PERCENTILE)
+            .rename('bronze')
+            .reset_index()
+    )
+    durations['gold'] = standards.times(durations['Event_name'], 'gold_y')
+    durations['silver'] = standards.times(durations['Event_name'], 'silver_y')
+    durations = durations.merge(bronze_times, on=['season', 'Event_name'], how='left')
+
+    level = durations['qualified_meet']
+    heat_length = np.select([level == GOLD, level == SILVER], [durations['gold'], durations['silver']],
+                            default=durations['bronze'].fillna(durations['silver']))
+    durations['heats'] = -(-durations['qualifiers'] // lanes)
+    est_duration = durations['heats'] * (np.nan_to_num(heat_length) + heat_time * 100) + event_delay * 100
+    durations['est_duration'] = np.round(est_duration).astype('int64')
+    return durations.drop(columns=['gold', 'silver', 'bronze'])
+
+
+# Function to simulate meet lengths by Monte Carlo. In every replicate, each (season, event, level)
+# field is redrawn with replacement from that field's actual entrant times, seeded fastest-last into
+# heats of `lanes` swimmers, and every heat lasts as long as its slowest swimmer. All heats of all
+# replicates in a batch are computed with array operations, with no Python loop per heat.
+# Returns the requested percentiles of each (season, level) total in hundredths. The totals add the
+# same between-heat and between-event delays as estimate_meet_durations.
+def simulate_meet_durations(entries, heat_time, event_delay, replicates=1000, lanes=DEFAULT_LANES,
+                            percentiles=(50, 90, 95), seed=None, season=None):
+    entries = _prepare_entries(entries, season)
+    grid = _level_counts(entries)
+    rng = np.random.default_rng(seed)
+
+    # fields (levels of events with at least one entrant) ordered by season, level and event
+    grid['level_rank'] = grid['qualified_meet'].map({level: rank for rank, level in enumerate(MEET_RANKING)})
+    grid = grid.sort_values(['season', 'level_rank', 'Event_name'], ignore_index=True)
+    fields = grid[grid['qualifiers'] > 0].reset_index(drop=True)
+    meets = grid[['season', 'qualified_meet']].drop_duplicates(ignore_index=True)
+
+    # every field's actual entrant times, contiguous
+    keyed = entries.merge(fields[['season', 'Event_name', 'qualified_meet']].reset_index(names='field'),
+                          on=['season', 'Event_name', 'qualified_meet'])
+    keyed = keyed.sort_values('field', kind='stable')
+    pool = keyed['converted_hundredths'].to_numpy(dtype='float64')
+    counts = fields['qualifiers'].to_numpy()
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    field_of_slot = np.repeat(np.arange(len(fields)), counts)
+
+    # last slot of every heat once a field is sorted fastest first (the remainder heat swims first)
+    heats_per_field = -(-counts // lanes)
+    heat_field = np.repeat(np.arange(len(fields)), heats_per_field)
+    heat_number = np.arange(len(heat_field)) - np.repeat(np.cumsum(heats_per_field) - heats_per_field, heats_per_field)
+    heat_last_slot = starts[heat_field] + np.minimum((heat_number + 1) * lanes, counts[heat_field]) - 1
+    heat_starts = np.concatenate(([0], np.cumsum(heats_per_field)[:-1]))
+
+    # fields and delays belonging to each meet
+    meet_of_field = fields.merge(meets.reset_index(names='meet'), on=['season', 'qualified_meet'], how='left')['meet'].to_numpy()
+    events_per_meet = grid.groupby(['season', 'qualified_meet'], sort=False).size().reindex(
+        pd.MultiIndex.from_frame(meets)).to_numpy()
+
+    band = pool.max() + 1 if len(pool) else 1
+    batch = max(1, SIMULATION_BATCH_SWIMS // max(len(pool), 1))
+    totals = []
+    for done in range(0, replicates, batch):
+        size = min(batch, replicates - done)
+        draws = starts[field_of_slot] + np.floor(rng.random((size, len(pool))) * counts[field_of_slot]).astype('int64')
+        # sort each field within its own band so one sort orders every field of every replicate
+        seeded = np.sort(pool[draws] + field_of_slot * band, axis=1) - field_of_slot * band
+
+        heat_lengths = seeded[:, heat_last_slot] + heat_time * 100
+        field_durations = np.add.reduceat(heat_lengths, heat_starts, axis=1) if len(heat_starts) else np.zeros((size, 0))
+        meet_durations = np.zeros((size, len(meets)))
+        np.add.at(meet_durations.T, meet_of_field, field_durations.T)
+        totals.append(meet_durations + events_per_meet * event_delay * 100)
+    totals = np.concatenate(totals)
+
+    summary = meets.copy()
+    summary['mean'] = totals.mean(axis=0)
+    for pct in percentiles:
+        summary[f'p{pct}'] = np.percentile(totals, pct, axis=0)
+    return summary
+
+
+# Function to limit each swimmer to their highest-priority meet and to a number of distinct events
+# there, in one vectorized pass over the whole league. Each athlete is first reduced to their best
+# swim in every event, then the policy picks which events are entered:
+#   'fastest'           - the athlete's `limit` strongest events, ranked by the percentile of their
+#                         best time among everyone's best times in the event (so a 25 is not
+#                         favoured over a 100 IM just for being shorter)
+#   'meet_entry_limit'  - as 'fastest', up to entry_limits[meet] entries (MEET_ENTRY_LIMITS unless
+#                         given); with the shipped limits, 3 at every meet, this matches 'fastest'
+#   'random'            - `limit` events picked at random, reproducible through seed
+def dedup_entries(df, policy='fastest', limit=DEFAULT_ENTRY_LIMIT, seed=1, entry_limits=None):
+    # Define meet ranking order using pd.Categorical
+    df['qualified_meet'] = pd.Categorical(df['qualified_meet'], categories=MEET_RANKING, ordered=True)
+
+    # athlete ids are only unique within a season, so multi-season frames are deduped per season
+    athlete_keys = ['season', 'athlete_id'] if 'season' in df else ['athlete_id']
+    season_keys = athlete_keys[:-1]
+
+    # Keep each athlete's best swim in every event (it also qualifies for their best meet in it)
+    best = df.sort_values(by=athlete_keys + ['Event_name', 'converted_hundredths'], kind='stable')
+    best = best.drop_duplicates(athlete_keys + ['Event_name']).reset_index(drop=True)
+    # percentile rank of the best time within the event's field, the same scale for every distance
+    event_rank = best.groupby(season_keys + ['Event_name'], observed=True)['converted_hundredths'].rank(method='min', pct=True)
+
+    # For each swimmer, keep only the highest-priority meet
+    highest = best.groupby(athlete_keys)['qualified_meet'].transform('min') == best['qualified_meet']
+    df_highest_priority = best[highest]
+
+    if policy in ('fastest', 'meet_entry_limit'):
+        selection_order = event_rank[highest].to_numpy()
+    elif policy == 'random':
+        selection_order = np.random.default_rng(seed).random(len(df_highest_priority))
+    else:
+        raise ValueError(f"Unknown dedup policy: {policy}")
+
+    if policy == 'meet_entry_limit':
+        limits = df_highest_priority['qualified_meet'].map(entry_limits or MEET_ENTRY_LIMITS).astype('int64').to_numpy()
+    else:
+        limits = limit
+
+    # Rank every swimmer's entries in selection order and keep the first ones
+    df_sorted = df_highest_priority.assign(_selection_order=selection_order, _limit=limits)
+    df_sorted = df_sorted.sort_values(by=athlete_keys + ['_selection_order'], kind='stable')
+    keep = df_sorted.groupby(athlete_keys).cumcount() < df_sorted['_limit']
+    df_final = df_sorted[keep].drop(columns=['_selection_order', '_limit']).reset_index(drop=True)
+
+    return df_final
+
+
+# the gold meet adds 2 minutes for relays; silver and bronze are split over two meets (MEETS_PER_LEVEL) that add 2 minutes each
+RELAY_TIME = {'gold': 12000, 'silver': 24000, 'bronze': 24000}
+
+
+# Function to summarize every season's meets from the tidy duration table and the deduped entries.
+# Returns one row per season with each level's run time (per meet), entries (per meet) and athletes.
+def summarize_meets(durations, entries):
+    totals = durations.groupby(['season', 'qualified_meet'], observed=True)[['est_duration', 'qualifiers']].sum()
+    athletes = (entries.drop_duplicates(['season', 'athlete_id'])
+                .groupby(['season', 'qualified_meet'], observed=False).size())
+    seasons = sorted(durations['season'].unique())
+
+    meets = pd.DataFrame({'season': seasons})
+    for measure in ['duration', 'entries', 'athletes']:
+        for level in [GOLD, SILVER, BRONZE]:
+            name = level.lower()
+            index = pd.MultiIndex.from_product([seasons, [level]])
+            if measure == 'athletes':
+                meets[f'{name}_{measure}'] = athletes.reindex(index, fill_value=0).to_numpy()
+                continue
+            column = 'est_duration' if measure == 'duration' else 'qualifiers'
+            values = totals[column].reindex(index, fill_value=0).to_numpy()
+            if measure == 'duration':
+                values = values + RELAY_TIME[name]
+            meets[f'{name}_{measure}'] = values / MEETS_PER_LEVEL[name] if MEETS_PER_LEVEL[name] > 1 else values
+    return meets
+
+
+# Function to lay out one season of estimate_meet_durations in the original wide format
+# (one row per event of the season's entries, one column per level and measure)
+def widen_meet_durations(durations, entries, season):
+    season_durations = durations[durations['season'] == season]
+    wide = season_durations.pivot(index='Event_name', columns='qualified_meet', values=['qualifiers', 'heats', 'est_duration'])
+
+    # Create a summary DataFrame
+    times_df = pd.DataFrame({'Event_name': get_event_names(entries[entries['season'] == season])})
+    for level in [GOLD, SILVER, BRONZE]:
+        for measure in ['qualifiers', 'heats', 'est_duration']:
+            times_df[f'{level.lower()}_{measure}-{season}'] = wide[(measure, level)].reindex(times_df['Event_name']).to_numpy(dtype='int64')
+
+    return times_df
+
+
+# Function to estimate each event's heats and duration at every level for one season, in the
+# original wide layout (one row per event, one column per level and measure).
+# proposed_standards is a StandardsTable.
+def get_estimated_meet_duration(df, season, proposed_standards, heat_time, event_delay):
+    df = df.assign(season=season)
+    durations = estimate_meet_durations(df, proposed_standards, heat_time, event_delay)
+    return widen_meet_durations(durations, df, season)
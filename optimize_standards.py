@@ -0,0 +1,189 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from constants import GOLD, SILVER, BRONZE, MEET_RANKING, DEFAULT_HEAT_TIME_SECONDS, DEFAULT_EVENT_TIME_SECONDS
+from percentiles import sort_event_times, event_quantiles, get_proposed_standards
+from meet_duration import estimate_meet_durations, dedup_entries, summarize_meets
+from standards import StandardsTable, load_current_standards
+from ingest_cache import load_results
+from events import classify_meet
+from utils import convert_hundredths_to_time
+
+# Percentiles searched by default
+DEFAULT_GOLD_RANGE = (0.05, 0.40)
+DEFAULT_SILVER_RANGE = (0.30, 0.85)
+DEFAULT_STEP = 0.01
+
+HUNDREDTHS_PER_HOUR = 360000
+
+
+# Meet summaries for any (gold_pct, silver_pct) pair, without re-reading or re-sorting anything.
+# Every event's times are sorted once and its quantile at every searchable percentile is read off
+# up front, so a candidate only classifies, dedups and times the swims of the fitted seasons. Each
+# candidate's summary is remembered, so the search never evaluates a pair twice.
+class StandardsSearch:
+    def __init__(self, df, current_standards, seasons, heat_time, event_time, pcts, dedup_policy='fastest', entry_limits=None):
+        events, sorted_values = sort_event_times(df)
+        self.pcts = np.asarray(pcts, dtype='float64')
+        # proposed standards are written as MM:SS.hh, which drops anything below a hundredth
+        self.quantiles = np.floor(event_quantiles(events, sorted_values, self.pcts))
+        self.event_names = events['Event_name'].astype(str)
+
+        swims = df[df['season'].isin(seasons) & current_standards.contains(df['Event_name'])]
+        self.swims = swims.reset_index(drop=True)
+        self.heat_time = heat_time
+        self.event_time = event_time
+        self.dedup_policy = dedup_policy
+        self.entry_limits = entry_limits
+        self.summaries = {}
+
+    # Function to return the per-season meet summary (summarize_meets) for one pair of percentile positions
+    def evaluate(self, gold_index, silver_index):
+        if (gold_index, silver_index) not in self.summaries:
+            standards = StandardsTable(self.event_names, {'gold_y': self.quantiles[:, gold_index], 'silver_y': self.quantiles[:, silver_index]}, {})
+            swims = self.swims[standards.contains(self.swims['Event_name'])]
+            entries = swims.assign(qualified_meet=classify_meet(swims['converted_hundredths'],
+                standards.times(swims['Event_name'], 'gold_y'), standards.times(swims['Event_name'], 'silver_y'), swims['Event_name']))
+            deduped = dedup_entries(entries, self.dedup_policy, entry_limits=self.entry_limits)
+            durations = estimate_meet_durations(deduped, standards, self.heat_time, self.event_time)
+            self.summaries[(gold_index, silver_index)] = summarize_meets(durations, deduped)
+        return self.summaries[(gold_index, silver_index)]
+
+
+# Function to check a meet summary against the constraints in every season.
+# max_hours and min_athletes map 'gold'/'silver'/'bronze' to a limit (or None for no limit).
+def meets_constraints(meets, max_hours, min_athletes):
+    for level, hours in max_hours.items():
+        if hours is not None and (meets[f'{level}_duration'] > hours * HUNDREDTHS_PER_HOUR).any():
+            return False
+    for level, athletes in min_athletes.items():
+        if athletes is not None and (meets[f'{level}_athletes'] < athletes).any():
+            return False
+    return True
+
+
+# Function to find the last position in indexes where predicate holds, by bisection, for a
+# predicate that holds up to some position and fails after it. Returns None if it never holds.
+def _last_passing(indexes, predicate):
+    low, high = 0, len(indexes)
+    while low < high:
+        middle = (low + high) // 2
+        if predicate(indexes[middle]):
+            low = middle + 1
+        else:
+            high = middle
+    return indexes[low - 1] if low else None
+
+
+# Function to find the most inclusive standards that satisfy the constraints: the highest gold
+# percentile that leaves room for a valid silver standard, then the highest silver percentile with it.
+# Every measure moves one way as a standard is relaxed, which is what keeps the search short:
+#   - the Gold Meet grows with the gold standard and hardly depends on the silver standard, so the
+#     longest allowed Gold Meet bounds the gold percentile and is found by bisection;
+#   - the Silver Meets grow and the Bronze Meets shrink with the silver standard, so for each gold
+#     percentile the highest silver percentile within the silver length and bronze size limits is
+#     also found by bisection;
+#   - a higher gold standard takes athletes out of the Silver Meets, so when the silver size or
+#     bronze length limits fail, a lower gold percentile is tried next.
+# Returns (gold_pct, silver_pct), or None when no searched pair satisfies the constraints.
+def find_standards(search, gold_indexes, silver_indexes, max_hours, min_athletes):
+    def passes(gold_index, silver_index, levels_max, levels_min):
+        return meets_constraints(search.evaluate(gold_index, silver_index),
+                                 {level: max_hours[level] for level in levels_max},
+                                 {level: min_athletes[level] for level in levels_min})
+
+    # the gold meet is judged with the highest silver standard
+    top_silver = silver_indexes[-1]
+    golds = [index for index in gold_indexes if search.pcts[index] < search.pcts[top_silver]]
+    highest_gold = _last_passing(golds, lambda gold_index: passes(gold_index, top_silver, ['gold'], []))
+
+    for gold_index in [index for index in golds if highest_gold is not None and index <= highest_gold][::-1]:
+        if not passes(gold_index, top_silver, [], ['gold']):
+            return None  # lower gold percentiles only shrink the Gold Meet further
+        silvers = [index for index in silver_indexes if search.pcts[index] > search.pcts[gold_index]]
+        silver_index = _last_passing(silvers, lambda index: passes(gold_index, index, ['silver'], ['bronze']))
+        if silver_index is None:
+            return None  # lower gold percentiles only lengthen the Silver Meets
+        if passes(gold_index, silver_index, ['bronze'], ['silver']):
+            return float(search.pcts[gold_index]), float(search.pcts[silver_index])
+    return None
+
+
+# Function to list every pair the search evaluated, one row per pair and season
+def evaluated_candidates(search, max_hours, min_athletes):
+    rows = []
+    for (gold_index, silver_index), meets in sorted(search.summaries.items()):
+        rows.append(meets.assign(gold_pct=search.pcts[gold_index], silver_pct=search.pcts[silver_index],
+                                 feasible=meets_constraints(meets, max_hours, min_athletes)))
+    candidates = pd.concat(rows, ignore_index=True)
+    return candidates[['gold_pct', 'silver_pct', 'feasible'] + [column for column in candidates if column not in ('gold_pct', 'silver_pct', 'feasible')]]
+
+
+def main():
+    parser = argparse.ArgumentParser(__file__, description="Find the gold and silver percentiles whose standards meet target meet lengths and sizes")
+
+    parser.add_argument("--files", default='./gasl*.csv', help="Results file pattern (default: ./gasl*.csv)")
+    parser.add_argument("--season", type=int, nargs='+', default=None, help="Seasons the constraints must hold in (default: latest)")
+    parser.add_argument("--max-gold-hours", type=float, default=None, help="Longest acceptable Gold Meet, in hours")
+    parser.add_argument("--max-silver-hours", type=float, default=None, help="Longest acceptable Silver Meet (each), in hours")
+    parser.add_argument("--max-bronze-hours", type=float, default=None, help="Longest acceptable Bronze Meet (each), in hours")
+    parser.add_argument("--min-gold-athletes", type=int, default=None, help="Fewest athletes the Gold Meet may have")
+    parser.add_argument("--min-silver-athletes", type=int, default=None, help="Fewest athletes the Silver Meets may have")
+    parser.add_argument("--min-bronze-athletes", type=int, default=None, help="Fewest athletes the Bronze Meets may have")
+    parser.add_argument("--gold-range", type=float, nargs=2, default=DEFAULT_GOLD_RANGE, help=f"Lowest and highest gold percentile to try (default: {DEFAULT_GOLD_RANGE[0]} {DEFAULT_GOLD_RANGE[1]})")
+    parser.add_argument("--silver-range", type=float, nargs=2, default=DEFAULT_SILVER_RANGE, help=f"Lowest and highest silver percentile to try (default: {DEFAULT_SILVER_RANGE[0]} {DEFAULT_SILVER_RANGE[1]})")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help=f"Spacing of the percentiles tried (default: {DEFAULT_STEP})")
+    parser.add_argument("--heat-time", type=int, default=DEFAULT_HEAT_TIME_SECONDS, help="Seconds between heats")
+    parser.add_argument("--event-time", type=int, default=DEFAULT_EVENT_TIME_SECONDS, help="Seconds between events")
+    parser.add_argument("--dedup-policy", choices=['fastest', 'meet_entry_limit', 'random'], default='fastest', help="How each athlete's entries are picked (default: fastest)")
+    parser.add_argument("--entry-limits", type=int, nargs=3, default=None, metavar=('GOLD', 'SILVER', 'BRONZE'), help="Events each athlete may swim at the Gold, Silver and Bronze Meets with --dedup-policy meet_entry_limit (default: MEET_ENTRY_LIMITS in constants.py)")
+    parser.add_argument("--output", default='optimizer_results.csv', help="Every pair tried and its meets (default: optimizer_results.csv)")
+
+    options = parser.parse_args()
+    max_hours = {'gold': options.max_gold_hours, 'silver': options.max_silver_hours, 'bronze': options.max_bronze_hours}
+    min_athletes = {'gold': options.min_gold_athletes, 'silver': options.min_silver_athletes, 'bronze': options.min_bronze_athletes}
+    if all(limit is None for limit in [*max_hours.values(), *min_athletes.values()]):
+        parser.error('give at least one --max-*-hours or --min-*-athletes constraint')
+    if options.entry_limits and options.dedup_policy != 'meet_entry_limit':
+        parser.error('--entry-limits only applies with --dedup-policy meet_entry_limit')
+    if options.entry_limits and min(options.entry_limits) < 1:
+        parser.error('--entry-limits must allow at least one event at every meet')
+    entry_limits = dict(zip(MEET_RANKING, options.entry_limits)) if options.entry_limits else None
+
+    started = time.perf_counter()
+    df = load_results(options.files)
+    current_standards = load_current_standards()
+    seasons = options.season or [int(df['season'].max())]
+
+    # every searchable percentile, rounded so 0.15 stays 0.15 in file names and reports
+    gold_pcts = np.round(np.arange(options.gold_range[0], options.gold_range[1] + options.step / 2, options.step), 4)
+    silver_pcts = np.round(np.arange(options.silver_range[0], options.silver_range[1] + options.step / 2, options.step), 4)
+    pcts = np.unique(np.concatenate([gold_pcts, silver_pcts]))
+    search = StandardsSearch(df, current_standards, seasons, options.heat_time, options.event_time, pcts, options.dedup_policy, entry_limits)
+
+    result = find_standards(search, list(np.searchsorted(pcts, gold_pcts)), list(np.searchsorted(pcts, silver_pcts)), max_hours, min_athletes)
+    evaluated_candidates(search, max_hours, min_athletes).to_csv(options.output, index=False)
+    print(f'Tried {len(search.summaries)} percentile pairs in {time.perf_counter() - started:.1f}s; every pair tried written to: {options.output}')
+
+    if result is None:
+        print('No gold and silver percentiles in the search range satisfy every constraint.')
+        return
+
+    gold_pct, silver_pct = result
+    meets = search.evaluate(*np.searchsorted(pcts, result))
+    print(f'\nTop {gold_pct:.0%} for Gold and top {silver_pct:.0%} for Silver satisfy every constraint:')
+    for meet in meets.to_dict('records'):
+        for level in [GOLD, SILVER, BRONZE]:
+            name = level.lower()
+            print(f'  {meet["season"]} {level.capitalize()} Meet: {convert_hundredths_to_time(meet[f"{name}_duration"])}, {meet[f"{name}_entries"]:.0f} entries, {meet[f"{name}_athletes"]} athletes')
+
+    combined, _ = get_proposed_standards(df, current_standards, gold_pct, silver_pct)
+    output_file = f'optimized_standards_{gold_pct}_{silver_pct}.csv'
+    combined.to_csv(output_file, index=False)
+    print(f'\nStandards written to: {output_file}')
+    print(f'Run gasl_time_standards.py with {gold_pct} and {silver_pct} for the full comparison with the current standards.')
+
+# Main execution
+if __name__ == "__main__":
+    main()
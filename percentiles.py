@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from functools import reduce
+from constants import METERS_FACTOR
+from events import event_names, gasl_event_ids
+from utils import add_event_names_column, convert_hundredths_to_times
+
+# Columns that make up one event in the results files
+EVENT_COLUMNS = ['age_group', 'distance', 'stroke']
+
+
+# Sort every event's times once so any number of percentiles can be read off the same arrays.
+# Returns a DataFrame with one row per event (in groupby order) holding the event columns, its
+# 'Event_name' and the 'start'/'count' of its slice in the returned sorted hundredths array.
+def sort_event_times(df, time_column='converted_hundredths'):
+    grouped = df.groupby(EVENT_COLUMNS, observed=True)
+    codes = grouped.ngroup().to_numpy()
+    values = df[time_column].to_numpy(dtype='float64')
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+
+    events = grouped.size().rename('count').reset_index()
+    events['Event_name'] = event_names(events['age_group'], events['distance'], events['stroke'])
+    events['start'] = np.concatenate(([0], np.cumsum(events['count'].to_numpy())[:-1]))
+    return events, sorted_values
+
+
+# Linearly interpolated quantiles (the pandas/numpy default) of every event for every pct.
+# Returns an array shaped (events, pcts).
+def event_quantiles(events, sorted_values, pcts):
+    pcts = np.asarray(pcts, dtype='float64')
+    starts = events['start'].to_numpy()[:, None]
+    counts = events['count'].to_numpy()[:, None]
+
+    position = pcts[None, :] * (counts - 1)
+    below = np.floor(position).astype('int64')
+    above = np.minimum(below + 1, counts - 1)
+    fraction = position - below
+
+    low = sorted_values[starts + below]
+    high = sorted_values[starts + above]
+    # same lerp as numpy.quantile so results match Series.quantile exactly
+    difference = high - low
+    return np.where(fraction >= 0.5, high - difference * (1 - fraction), low + difference * fraction)
+
+
+# Function to list the event names in the same order as grouping by 'age_group', 'distance', and 'stroke'
+def get_event_names(df):
+    return add_event_names_column(df.groupby(EVENT_COLUMNS, observed=True).size().reset_index())['Event_name']
+
+
+# Function to get the percentile threshold for each unique event
+def get_percentile_summary(df, standard, pct):
+    events, sorted_values = sort_event_times(df)
+    threshold_values = pd.Series(event_quantiles(events, sorted_values, [pct])[:, 0])
+
+    # Create a summary DataFrame
+    summary_df = pd.DataFrame({
+        'Event_name': events['Event_name'],
+        'GASL_Event_ID': gasl_event_ids(events['Event_name']),
+        f'new_{standard}_y': convert_hundredths_to_times(threshold_values),
+        f'new_{standard}_s' : convert_hundredths_to_times(threshold_values * METERS_FACTOR)
+    })
+    return summary_df
+
+
+# Function to compute the proposed gold/silver standards and join them to the current standards
+# (a StandardsTable). Returns the proposed standards and the proposed standards with the current
+# standard columns added; StandardsTable.from_proposed turns the first into a table.
+def get_proposed_standards(df, current_standards, gold_pct, silver_pct):
+    standards = {
+        "gold": gold_pct,
+        "silver" : silver_pct
+    }
+    
+    summary = []
+    for standard, pct in standards.items():
+        # Get the percentile summary
+        summary_df = get_percentile_summary(df, standard, pct)
+        summary.append(summary_df)
+
+    combined=reduce(lambda x, y: pd.merge(x, y, on = 'Event_name'), summary)
+    
+    add_current = combined.merge(current_standards.to_frame(), on = "Event_name")
+    return combined, add_current
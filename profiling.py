@@ -0,0 +1,75 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then left out
+    resource = None
+
+
+# Peak resident set size of this process and of its finished child processes, in MB
+def _peak_rss_mb():
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+# Records wall time, CPU time, peak memory and row counts for each stage of a run.
+# A disabled profiler runs the stages without measuring anything, so callers can always
+# wrap their stages:
+#
+#     with profiler.stage('load results') as stage:
+#         df = load_results(pattern)
+#         stage['rows'] = len(df)
+class StageProfiler:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self.started = time.time()
+
+    @contextmanager
+    def stage(self, name):
+        record = {'stage': name}
+        if not self.enabled:
+            yield record
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            record['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            # the RSS high-water marks cover the whole run up to the end of this stage
+            record['peak_rss_mb'], record['peak_child_rss_mb'] = _peak_rss_mb()
+            self.stages.append(record)
+
+    # Function to write the recorded stages, with run metadata such as the options used, as JSON
+    def write(self, path, **metadata):
+        if not self.enabled:
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        report = {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total_wall_seconds': time.time() - self.started,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            **metadata,
+            'stages': self.stages,
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f'Profile written to: {os.path.abspath(path)}')
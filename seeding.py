@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from constants import MEET_RANKING, MEETS_PER_LEVEL, DEFAULT_LANES
+from events import gasl_event_ids
+from utils import convert_hundredths_to_times
+
+# Columns that identify one meet (session) and one event within it
+SESSION_COLUMNS = ['season', 'qualified_meet', 'meet']
+EVENT_COLUMNS = SESSION_COLUMNS + ['Event_name']
+
+
+# Lanes in the order they are filled: center lanes first, working outward, the lower lane first
+# when two are equally close to the center (6 lanes: 3, 4, 2, 5, 1, 6)
+def lane_order(lanes=DEFAULT_LANES):
+    lane = np.arange(1, lanes + 1)
+    return lane[np.lexsort((lane, np.abs(2 * lane - (lanes + 1))))]
+
+
+# Function to seed every event at every meet into heats and lanes in one vectorized pass.
+# entries are deduped qualifier entries (dedup_entries / run_qualifier_pipeline) with 'season',
+# 'athlete_id', 'qualified_meet', 'Event_name' and 'converted_hundredths'. Only each athlete's
+# fastest entry in an event is seeded, whatever the input holds. The athletes of a level are split
+# evenly over its MEETS_PER_LEVEL meets (numbered from 1 in the 'meet' column), as the meet
+# summaries assume, and each athlete swims all their events at one of them.
+# Each event is seeded fastest-last: the fastest `lanes` swimmers make up the final heat, the next
+# fastest the heat before it, and any partial heat swims first. Within a heat the faster swimmers
+# get the center lanes (lane_order).
+# Returns the entries in swim order (meet, GASL event order, heat, lane) with 'meet',
+# 'GASL_Event_ID', 'heat', 'heats' (in the event) and 'lane' columns.
+def seed_heats(entries, lanes=DEFAULT_LANES, meets_per_level=MEETS_PER_LEVEL):
+    athlete_keys = ['season', 'athlete_id'] if 'athlete_id' in entries else None
+    if athlete_keys:
+        entries = entries.sort_values('converted_hundredths', kind='stable').drop_duplicates(athlete_keys + ['Event_name'])
+    entries = entries.reset_index(drop=True)
+    level_rank = pd.Categorical(entries['qualified_meet'].astype(str), categories=MEET_RANKING).codes
+    gasl_ids = gasl_event_ids(entries['Event_name']).to_numpy()
+    # events are told apart by name, so events outside the catalogue (GASL event ID 0) stay separate
+    codes = pd.Categorical(entries['Event_name']).codes
+    # ties on time go to the lower athlete id so the seeding is reproducible
+    athletes = entries['athlete_id'].to_numpy() if athlete_keys else np.arange(len(entries))
+
+    # every athlete of a level goes to one of its meets, alternating in athlete order
+    meets = entries['qualified_meet'].astype(str).str.lower().map(meets_per_level).fillna(1).astype('int64').to_numpy()
+    athlete_number = pd.Series(athletes).groupby([entries['season'], level_rank]).rank(method='dense').to_numpy(dtype='int64') - 1
+    meet = athlete_number % meets + 1
+
+    order = np.lexsort((athletes, entries['converted_hundredths'].to_numpy(), codes, gasl_ids, meet, level_rank, entries['season'].to_numpy()))
+    seeded = entries.iloc[order].reset_index(drop=True)
+
+    # the (meet, event) group of every seeded swim, and its rank within the group (0 = fastest)
+    keys = np.column_stack([entries['season'].to_numpy()[order], level_rank[order], meet[order], codes[order]])
+    group_starts = np.flatnonzero(np.concatenate(([True], (keys[1:] != keys[:-1]).any(axis=1))))
+    group_sizes = np.diff(np.append(group_starts, len(seeded)))
+    group_of_swim = np.repeat(np.arange(len(group_starts)), group_sizes)
+    rank = np.arange(len(seeded)) - group_starts[group_of_swim]
+
+    heats = -(-group_sizes // lanes)
+    heat = heats[group_of_swim] - rank // lanes
+    lane = lane_order(lanes)[rank % lanes]
+
+    seeded.insert(seeded.columns.get_loc('qualified_meet') + 1, 'meet', meet[order])
+    seeded.insert(seeded.columns.get_loc('Event_name') + 1, 'GASL_Event_ID', gasl_ids[order])
+    seeded['heat'] = heat
+    seeded['heats'] = heats[group_of_swim]
+    seeded['lane'] = lane
+    # swim order: within each event the first heat swims first and lanes read left to right
+    swim_order = np.lexsort((lane, heat, group_of_swim))
+    return seeded.iloc[swim_order].reset_index(drop=True)
+
+
+# Function to lay seeded heats (seed_heats) out on a clock. A heat lasts as long as its slowest
+# seed time plus heat_time seconds to clear the pool, and every event is followed by event_delay
+# seconds, as in the duration estimates. Each (season, qualified_meet, meet) is one session starting at 0.
+# Returns one row per heat with its swimmers and its start and end within the session, in hundredths.
+def heat_timeline(seeded, heat_time, event_delay):
+    heat_starts = np.flatnonzero(np.concatenate(([True], (seeded[EVENT_COLUMNS + ['heat']].iloc[1:].to_numpy()
+                                                          != seeded[EVENT_COLUMNS + ['heat']].iloc[:-1].to_numpy()).any(axis=1))))
+    times = seeded['converted_hundredths'].to_numpy(dtype='float64')
+    heats = seeded.iloc[heat_starts][EVENT_COLUMNS + ['GASL_Event_ID', 'heat', 'heats']].reset_index(drop=True)
+    heats['swimmers'] = np.diff(np.append(heat_starts, len(seeded)))
+    heats['heat_length'] = (np.maximum.reduceat(times, heat_starts) if len(times) else times) + heat_time * 100
+
+    # the delay after the last heat of each event belongs to that event's slot on the clock
+    slot = heats['heat_length'].to_numpy() + np.where(heats['heat'] == heats['heats'], event_delay * 100, 0)
+    session_starts = np.flatnonzero(np.concatenate(([True], (heats[SESSION_COLUMNS].iloc[1:].to_numpy()
+                                                             != heats[SESSION_COLUMNS].iloc[:-1].to_numpy()).any(axis=1))))
+    session_of_heat = np.repeat(np.arange(len(session_starts)), np.diff(np.append(session_starts, len(heats))))
+    elapsed = np.cumsum(slot)
+    heats['start'] = np.round(elapsed - slot - np.append(0, elapsed)[session_starts][session_of_heat]).astype('int64')
+    heats['end'] = np.round(heats['start'] + heats['heat_length']).astype('int64')
+    return heats
+
+
+# Function to summarize a heat timeline per event and per session. Returns (events, sessions):
+# each event's heats, swimmers, start and end, and each session's events, heats, swimmers and
+# finishing time (after the final event delay), all in hundredths with MM:SS.hh text columns.
+def event_and_session_timelines(heats, event_delay):
+    events = (heats.groupby(EVENT_COLUMNS + ['GASL_Event_ID'], sort=False, observed=True)
+                   .agg(heats=('heat', 'size'), swimmers=('swimmers', 'sum'), start=('start', 'min'), end=('end', 'max'))
+                   .reset_index())
+    sessions = (events.groupby(SESSION_COLUMNS, sort=False, observed=True)
+                      .agg(events=('Event_name', 'size'), heats=('heats', 'sum'), swimmers=('swimmers', 'sum'), end=('end', 'max'))
+                      .reset_index())
+    sessions['end'] = sessions['end'] + event_delay * 100
+    for frame, columns in [(events, ['start', 'end']), (sessions, ['end'])]:
+        for column in columns:
+            frame[f'{column}_time'] = convert_hundredths_to_times(frame[column])
+    return events, sessions
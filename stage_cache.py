@@ -0,0 +1,94 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+from constants import (CACHE_DIR, CURRENT_STANDARDS_FILE, STAGE_CACHE_MAX_MB, METERS_FACTOR, BRONZE_HEAT_PERCENTILE,
+                       DEFAULT_LANES, DEFAULT_ENTRY_LIMIT, MEET_ENTRY_LIMITS, MEETS_PER_LEVEL)
+from utils import file_hash
+
+# Bump when a memoized stage's output changes shape so old entries are no longer reused
+STAGE_CACHE_VERSION = 2
+
+# Tuning constants from constants.py that the memoized stages depend on. They are part of every key,
+# so editing one of them recomputes the stages instead of reusing results made with the old value.
+TUNING_CONSTANTS = {
+    'METERS_FACTOR': METERS_FACTOR,
+    'BRONZE_HEAT_PERCENTILE': BRONZE_HEAT_PERCENTILE,
+    'DEFAULT_LANES': DEFAULT_LANES,
+    'DEFAULT_ENTRY_LIMIT': DEFAULT_ENTRY_LIMIT,
+    'MEET_ENTRY_LIMITS': MEET_ENTRY_LIMITS,
+    'MEETS_PER_LEVEL': MEETS_PER_LEVEL,
+}
+
+
+# Function to fingerprint the inputs every stage depends on: the content of each results file
+# (in the order they are read) and of the current standards. Touching or renaming a file keeps
+# the fingerprint; editing one changes it.
+def input_fingerprint(file_path_pattern, standards_file=CURRENT_STANDARDS_FILE):
+    hashes = [file_hash(file) for file in sorted(glob.glob(file_path_pattern))] + [file_hash(standards_file)]
+    return hashlib.sha1(json.dumps(hashes).encode()).hexdigest()
+
+
+# On-disk memo of pipeline stage results. Each result is pickled under a key made from the input
+# fingerprint, the tuning constants, the stage name and the stage's parameters, so a repeat run reuses every stage and a
+# run with new parameters reuses the stages those parameters do not reach. The total size is kept
+# under max_mb by deleting the least recently used entries (reading an entry refreshes it).
+# A disabled cache always recomputes and stores nothing.
+class StageCache:
+    def __init__(self, inputs, cache_dir=CACHE_DIR, max_mb=STAGE_CACHE_MAX_MB, enabled=True):
+        self.inputs = inputs
+        self.path = os.path.join(cache_dir, 'stages')
+        self.max_bytes = max_mb * 1024 * 1024
+        self.enabled = enabled
+        self.last_hit = False
+
+    def _entry(self, stage, params):
+        key = json.dumps([STAGE_CACHE_VERSION, TUNING_CONSTANTS, self.inputs, stage, params], sort_keys=True, default=str)
+        return os.path.join(self.path, f'{stage.replace(" ", "_")}-{hashlib.sha1(key.encode()).hexdigest()}.pkl')
+
+    # Function to return the cached result of a stage for these parameters, computing and storing
+    # it with compute() when there is none. params must be JSON-like (numbers, strings, lists, dicts).
+    def memoize(self, stage, params, compute):
+        self.last_hit = False
+        if not self.enabled:
+            return compute()
+
+        entry = self._entry(stage, params)
+        try:
+            with open(entry, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(entry)
+            self.last_hit = True
+            return result
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass
+
+        result = compute()
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp_entry = f'{entry}.tmp-{os.getpid()}'
+            with open(tmp_entry, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_entry, entry)
+            self.evict()
+        except OSError as e:
+            print(f'Unable to cache {stage}: {e}')
+        return result
+
+    # Function to delete the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # another process got there first
+            total -= size
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from constants import CURRENT_STANDARDS_FILE
+from utils import read_csv_files, add_event_names_column, convert_times_to_hundredths, report_malformed_times
+
+# Standard columns: gold and silver times in yards (_y) and meters (_s)
+STANDARD_COLUMNS = ['gold_y', 'gold_s', 'silver_y', 'silver_s']
+
+
+# Gold and silver standards for every event, parsed once. The hundredths of each column are kept
+# in int64 arrays indexed by event key (the position of the event in `events`), and the original
+# text is kept for reports, so lookups never scan or re-parse the table.
+class StandardsTable:
+    def __init__(self, events, hundredths, text):
+        self.events = pd.Index(np.asarray(events, dtype=object))
+        self.hundredths = {column: np.asarray(values, dtype='int64') for column, values in hundredths.items()}
+        self.text = {column: np.asarray(values, dtype=object) for column, values in text.items()}
+
+    # Build a table from a DataFrame with 'Event_name' and MM:SS.hh text columns, renamed
+    # from source column to standard column by `columns`
+    @classmethod
+    def from_frame(cls, df, columns):
+        hundredths, text = {}, {}
+        for source, column in columns.items():
+            hundredths[column], malformed = convert_times_to_hundredths(df[source])
+            report_malformed_times(source, df[source], malformed)
+            text[column] = df[source].to_numpy(dtype=object)
+        return cls(df['Event_name'].astype(str), hundredths, text)
+
+    # Load current_standards.csv (age_group, distance, stroke and the four standard columns)
+    @classmethod
+    def from_csv(cls, file=CURRENT_STANDARDS_FILE):
+        standards = add_event_names_column(read_csv_files(file))
+        return cls.from_frame(standards, {column: column for column in STANDARD_COLUMNS})
+
+    # Build a table from proposed standards as returned by get_proposed_standards
+    @classmethod
+    def from_proposed(cls, proposed_times):
+        return cls.from_frame(proposed_times, {f'new_{column}': column for column in STANDARD_COLUMNS})
+
+    def __len__(self):
+        return len(self.events)
+
+    # Event key of every event name, -1 for events without standards. A categorical column is
+    # resolved once per category rather than once per row.
+    def event_keys(self, event_names):
+        names = pd.Series(event_names, copy=False)
+        if isinstance(names.dtype, pd.CategoricalDtype):
+            keys = self.events.get_indexer(names.cat.categories.astype(str))
+            codes = names.cat.codes.to_numpy()
+            return np.where(codes >= 0, keys[codes], -1)
+        return self.events.get_indexer(names.astype(str))
+
+    # Whether every event name has standards
+    def contains(self, event_names):
+        return self.event_keys(event_names) >= 0
+
+    # Hundredths of one standard column for every event name, NaN for events without standards
+    def times(self, event_names, column):
+        keys = self.event_keys(event_names)
+        return np.where(keys >= 0, self.hundredths[column][keys], np.nan)
+
+    # Original text of one standard column for every event name, '' for events without standards
+    def text_times(self, event_names, column):
+        keys = self.event_keys(event_names)
+        return np.where(keys >= 0, self.text[column][keys], '')
+
+    # The table as a DataFrame with 'Event_name' and the text of the given columns (all by default)
+    def to_frame(self, columns=STANDARD_COLUMNS):
+        frame = pd.DataFrame({'Event_name': self.events})
+        for column in columns:
+            frame[column] = self.text[column]
+        return frame
+
+
+# Function to load the current standards once as a StandardsTable
+def load_current_standards(file=CURRENT_STANDARDS_FILE):
+    return StandardsTable.from_csv(file)
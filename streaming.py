@@ -0,0 +1,284 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+from constants import CACHE_DIR, EVENT_INDEX_FILE, ATHLETE_KEY_COLUMNS, MEET_RANKING, METERS_FACTOR, DEFAULT_GOLD_PERCENTILE, DEFAULT_SILVER_PERCENTILE
+from utils import read_results_csv, prepare_results, concat_frames, get_seasons, convert_hundredths_to_times
+from standards import StandardsTable
+from events import gasl_event_ids, classify_meet
+from event_index import EventTimeIndex
+
+# Rows read from a results file at a time in streaming mode
+DEFAULT_CHUNKSIZE = 100000
+# Where incremental mode keeps each results file's aggregates
+STORE_DIR = os.path.join(CACHE_DIR, 'seasons')
+# Bump when StreamingAggregates changes so stored aggregates are rebuilt
+STORE_VERSION = 1
+
+
+# Exact histogram of integer hundredths. Only the range between the fastest and slowest time
+# seen is stored, so memory depends on the spread of times, not on the number of swims.
+class TimeHistogram:
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype='int64')
+
+    # Number of times in the histogram
+    def total(self):
+        return int(self.counts.sum())
+
+    # Widen the stored range so it covers [low, high]
+    def _cover(self, low, high):
+        if len(self.counts) == 0:
+            self.offset = low
+            self.counts = np.zeros(high - low + 1, dtype='int64')
+            return
+        new_low = min(low, self.offset)
+        new_high = max(high, self.offset + len(self.counts) - 1)
+        if new_low < self.offset or new_high >= self.offset + len(self.counts):
+            counts = np.zeros(new_high - new_low + 1, dtype='int64')
+            counts[self.offset - new_low:self.offset - new_low + len(self.counts)] = self.counts
+            self.offset, self.counts = new_low, counts
+
+    # Add an array of int hundredths
+    def add(self, values):
+        values = np.asarray(values, dtype='int64')
+        if len(values) == 0:
+            return
+        self._cover(int(values.min()), int(values.max()))
+        self.counts += np.bincount(values - self.offset, minlength=len(self.counts))
+
+    # Add every count of another histogram
+    def merge(self, other):
+        if other.total() == 0:
+            return
+        self._cover(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + len(other.counts)] += other.counts
+
+
+# Per-event aggregates built one chunk of results at a time: an exact histogram of hundredths for
+# every (season, event) and every athlete's best time per (season, event). Neither grows with the
+# number of swims, so whole archives can be summarized without loading them at once.
+class StreamingAggregates:
+    BEST_KEYS = ['season'] + ATHLETE_KEY_COLUMNS + ['Event_name']
+
+    def __init__(self):
+        self.histograms = {}
+        self.athlete_bests = None
+        self.rows = 0
+
+    # Fold one raw chunk of results (as read with the results schema) into the aggregates
+    def update(self, chunk):
+        chunk = prepare_results(chunk)
+        chunk['season'] = get_seasons(chunk['date'])
+        self.rows += len(chunk)
+
+        values = chunk['converted_hundredths'].to_numpy()
+        for key, positions in chunk.groupby(['season', 'Event_name'], observed=True).indices.items():
+            self.histograms.setdefault(key, TimeHistogram()).add(values[positions])
+
+        bests = chunk.groupby(self.BEST_KEYS, observed=True)['converted_hundredths'].min().reset_index()
+        if self.athlete_bests is not None:
+            bests = (concat_frames([self.athlete_bests, bests])
+                     .groupby(self.BEST_KEYS, observed=True)['converted_hundredths'].min().reset_index())
+        self.athlete_bests = bests
+
+    # Fold in every histogram and athlete best of another set of aggregates, e.g. another results file's
+    def merge(self, other):
+        for key, histogram in other.histograms.items():
+            self.histograms.setdefault(key, TimeHistogram()).merge(histogram)
+        if other.athlete_bests is not None:
+            bests = other.athlete_bests
+            if self.athlete_bests is not None:
+                bests = (concat_frames([self.athlete_bests, bests])
+                         .groupby(self.BEST_KEYS, observed=True)['converted_hundredths'].min().reset_index())
+            self.athlete_bests = bests
+        self.rows += other.rows
+
+    # Seasons seen so far
+    def seasons(self):
+        return sorted({int(season) for season, _ in self.histograms})
+
+    # One histogram per event, summed over the given seasons (all seasons by default)
+    def event_histograms(self, seasons=None):
+        combined = {}
+        for (season, event), histogram in self.histograms.items():
+            if seasons is None or season in seasons:
+                combined.setdefault(event, TimeHistogram()).merge(histogram)
+        return dict(sorted(combined.items()))
+
+    # Cumulative-count index over the event histograms of the given seasons (all seasons by default)
+    def event_index(self, seasons=None):
+        return EventTimeIndex.from_histograms(self.event_histograms(seasons))
+
+    # Proposed gold/silver standards per event, matching get_percentile_summary on the full data
+    def percentile_summary(self, gold_pct, silver_pct, seasons=None):
+        index = self.event_index(seasons)
+        events = index.events
+        gold_values = pd.Series(index.times_at_percentiles(events, np.full(len(events), gold_pct)))
+        silver_values = pd.Series(index.times_at_percentiles(events, np.full(len(events), silver_pct)))
+        summary_df = pd.DataFrame({
+            'Event_name': events,
+            'GASL_Event_ID': gasl_event_ids(events),
+            'new_gold_y': convert_hundredths_to_times(gold_values),
+            'new_gold_s': convert_hundredths_to_times(gold_values * METERS_FACTOR),
+            'new_silver_y': convert_hundredths_to_times(silver_values),
+            'new_silver_s': convert_hundredths_to_times(silver_values * METERS_FACTOR),
+        })
+        return summary_df.sort_values(by=['GASL_Event_ID'], ignore_index=True)
+
+    # Percentile of the current gold/silver standards (a StandardsTable) within each event,
+    # like get_current_percentile_summary
+    def current_percentile_summary(self, standards, seasons=None):
+        index = self.event_index(seasons)
+        events = standards.events[standards.events.isin(index.events)]
+        gold = standards.times(events, 'gold_y').astype('int64')
+        silver = standards.times(events, 'silver_y').astype('int64')
+        return pd.DataFrame({
+            'Event_name': events,
+            'current_gold_time': gold,
+            'current_gold_percentile': index.percentile_ranks(events, gold),
+            'current_silver_time': silver,
+            'current_silver_percentile': index.percentile_ranks(events, silver),
+        }).sort_values(by=['Event_name'], key=lambda names: names.astype(str), ignore_index=True)
+
+    # Qualifier counts for one season from each athlete's best time in each event, against a StandardsTable.
+    # Returns the number of athletes per level in every event, and the number of athletes per
+    # level when each athlete is counted once at the highest meet they qualify for.
+    def qualifier_counts(self, standards, season):
+        bests = self.athlete_bests[self.athlete_bests['season'] == season]
+        bests = bests[standards.contains(bests['Event_name'])]
+        level = classify_meet(bests['converted_hundredths'], standards.times(bests['Event_name'], 'gold_y'),
+                              standards.times(bests['Event_name'], 'silver_y'), bests['Event_name'])
+        bests = bests.assign(qualified_meet=pd.Categorical(level, categories=MEET_RANKING, ordered=True))
+
+        per_event = (
+            bests.groupby(['Event_name', 'qualified_meet'], observed=False).size()
+                .unstack(fill_value=0)
+                .rename(columns=lambda level: f'{level.lower()}_qualifiers')
+                .reset_index()
+        )
+        per_event = per_event[per_event.iloc[:, 1:].sum(axis=1) > 0]
+        per_event = per_event.sort_values('Event_name', key=lambda names: names.astype(str), ignore_index=True)
+        athletes = (
+            bests.groupby(ATHLETE_KEY_COLUMNS, observed=True)['qualified_meet'].min()
+                .value_counts()
+                .reindex(MEET_RANKING, fill_value=0)
+        )
+        return per_event, athletes
+
+
+# Function to build the streaming aggregates for every results file matching a pattern,
+# reading at most chunksize rows into memory at a time
+def stream_results(file_path_pattern, chunksize=DEFAULT_CHUNKSIZE):
+    aggregates = StreamingAggregates()
+    for file in sorted(glob.glob(file_path_pattern)):
+        for chunk in read_results_csv(file, chunksize=chunksize):
+            aggregates.update(chunk)
+    return aggregates
+
+
+# Identity of a results file: its stored aggregates are reused while all of these still match,
+# so unchanged files are never read again
+def _file_stamp(file):
+    stat = os.stat(file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'version': STORE_VERSION}
+
+
+# Function to bring the stored per-file aggregates up to date with the results files matching a
+# pattern and combine them. Only new or changed files are read (in chunks); every other file's
+# per-season, per-event histograms and athlete bests are loaded from store_dir, and the aggregates
+# of files that no longer match are deleted. Returns the combined aggregates and the files read.
+def update_store(file_path_pattern, store_dir=STORE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_file = os.path.join(store_dir, 'manifest.json')
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    aggregates, changed, files = StreamingAggregates(), [], {}
+    for file in sorted(glob.glob(file_path_pattern)):
+        key = os.path.abspath(file)
+        stamp = _file_stamp(file)
+        entry_file = os.path.join(store_dir, hashlib.sha1(key.encode()).hexdigest() + '.pkl')
+        file_aggregates = None
+        if manifest.get(key) == stamp:
+            try:
+                with open(entry_file, 'rb') as f:
+                    file_aggregates = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+                pass
+        if file_aggregates is None:
+            file_aggregates = stream_results(file, chunksize)
+            with open(entry_file, 'wb') as f:
+                pickle.dump(file_aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+            changed.append(file)
+        aggregates.merge(file_aggregates)
+        files[key] = stamp
+
+    # forget files that were removed or no longer match
+    for key in set(manifest) - set(files):
+        try:
+            os.remove(os.path.join(store_dir, hashlib.sha1(key.encode()).hexdigest() + '.pkl'))
+        except OSError:
+            pass
+    tmp_file = f'{manifest_file}.tmp-{os.getpid()}'
+    with open(tmp_file, 'w') as f:
+        json.dump(files, f)
+    os.replace(tmp_file, manifest_file)
+    return aggregates, changed
+
+
+# The latest `window` seasons of the aggregates (every season when window is not set)
+def window_seasons(aggregates, window=None):
+    seasons = aggregates.seasons()
+    return seasons[-window:] if window else seasons
+
+
+def main():
+    parser = argparse.ArgumentParser(__file__, description="Generate time standards from results files in bounded memory")
+
+    parser.add_argument("--files", default='./gasl*.csv', help="Results file pattern (default: ./gasl*.csv)")
+    parser.add_argument("--gold-pct", type=float, default=DEFAULT_GOLD_PERCENTILE, help="Percentile for the Gold Meet Standard")
+    parser.add_argument("--silver-pct", type=float, default=DEFAULT_SILVER_PERCENTILE, help="Percentile for the Silver Meet Standard")
+    parser.add_argument("--season", type=int, default=None, help="Season to count qualifiers for (default: latest)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows to read at a time")
+    parser.add_argument("--incremental", action="store_true", help=f"Keep each results file's aggregates in {STORE_DIR} and only read new or changed files")
+    parser.add_argument("--window", type=int, default=None, help="Base the standards on the latest N seasons only (default: every season)")
+    parser.add_argument("--index", default=None, help=f"Also write the league event time index of the window for close_to_pin.py (e.g. {EVENT_INDEX_FILE})")
+
+    options = parser.parse_args()
+
+    if options.incremental:
+        aggregates, changed = update_store(options.files, chunksize=options.chunksize)
+        print(f'{len(changed)} new or changed results file(s) read: {", ".join(changed) or "none"}')
+    else:
+        aggregates = stream_results(options.files, options.chunksize)
+    seasons = window_seasons(aggregates, options.window)
+    print(f'Aggregated {aggregates.rows} swims across seasons {aggregates.seasons()}; standards use {seasons}')
+
+    proposed = aggregates.percentile_summary(options.gold_pct, options.silver_pct, seasons)
+    proposed.to_csv(f'streaming_proposed_standards_{options.gold_pct}_{options.silver_pct}.csv', index=False)
+
+    current_standards = StandardsTable.from_csv()
+    aggregates.current_percentile_summary(current_standards, seasons).to_csv('streaming_current_percentile_analysis.csv', index=False)
+    if options.index:
+        aggregates.event_index(seasons).save(options.index)
+
+    season = options.season or seasons[-1]
+    per_event, athletes = aggregates.qualifier_counts(StandardsTable.from_proposed(proposed), season)
+    per_event.to_csv(f'streaming_qualifiers_{season}.csv', index=False)
+
+    print(f'\nAthletes per meet in {season} with the proposed standards:')
+    print(athletes.to_string())
+
+# Main execution
+if __name__ == "__main__":
+    main()
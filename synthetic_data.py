@@ -0,0 +1,182 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from constants import METERS_FACTOR
+from events import EVENT_CATALOGUE
+from percentiles import sort_event_times, event_quantiles
+from utils import convert_hundredths_to_times
+
+FIRST_NAMES = ['Ava', 'Liam', 'Emma', 'Noah', 'Mia', 'Owen', 'Zoe', 'Eli', 'Lily', 'Jack',
+               'Nora', 'Leo', 'Ruby', 'Finn', 'Ella', 'Max', 'Ivy', 'Sam', 'Cora', 'Ben']
+LAST_NAMES = ['Smith', 'Jones', 'Brown', 'Davis', 'Clark', 'Lewis', 'Walker', 'Hall', 'Young', 'King',
+              'Wright', 'Scott', 'Green', 'Baker', 'Adams', 'Nelson', 'Hill', 'Moore', 'Reed', 'Cook',
+              'Bell', 'Ward', 'Hayes', 'Price', 'Long', 'Ross', 'Wood', 'Gray', 'James', 'Perry']
+
+# Relative pace of each stroke against freestyle
+STROKE_FACTORS = {'Freestyle': 1.0, 'Backstroke': 1.15, 'Butterfly': 1.12, 'Breaststroke': 1.3, 'Individual Medley': 1.2}
+
+
+# Youngest and oldest age covered by a catalogue age group such as 'Boys 9-10' or 'Girls 8 & Under'
+def _age_range(age_group):
+    ages = age_group.split(' ', 1)[1]
+    if '& Under' in ages:
+        return 0, int(ages.split(' ')[0])
+    low, high = ages.split('-')
+    return int(low), int(high)
+
+
+# Catalogue event codes each (is_girl, age) may swim
+def _eligible_events():
+    catalogue = EVENT_CATALOGUE.reset_index()
+    girls = catalogue['age_group'].str.startswith(('Girls', 'Women'))
+    ranges = catalogue['age_group'].map(_age_range)
+    eligible = {}
+    for is_girl in (False, True):
+        for age in range(5, 19):
+            covers = ranges.map(lambda limits: limits[0] <= age <= limits[1])
+            eligible[(is_girl, age)] = catalogue.loc[(girls == is_girl) & covers, 'event_code'].to_numpy()
+    return eligible
+
+
+# Typical time in hundredths for a swimmer of each age in each event
+def _typical_hundredths(ages, event_codes):
+    catalogue = EVENT_CATALOGUE
+    distance = catalogue['distance'].to_numpy()[event_codes]
+    stroke = catalogue['stroke'].map(STROKE_FACTORS).to_numpy()[event_codes]
+    seconds_per_25 = 12.5 + 22 * np.exp(-(ages - 5) / 3.2)
+    return seconds_per_25 * stroke * (distance / 25) ** 1.06 * 100
+
+
+# Function to generate results for a whole league, shaped like the gasl*.csv exports.
+# Every team has swimmers_per_team swimmers who age by a year each season; each swimmer picks
+# events_per_swimmer events they are eligible for and swims them at most of the season's meets.
+# Returns a dict of season -> results DataFrame.
+def generate_results(teams=30, seasons=3, swimmers_per_team=150, events_per_swimmer=4, meets_per_season=7,
+                     first_season=2022, seed=0):
+    rng = np.random.default_rng(seed)
+    eligible = _eligible_events()
+    # every age group has five individual events, so nobody can swim more than that
+    events_per_swimmer = min(events_per_swimmer, min(len(codes) for codes in eligible.values()))
+    team_names = np.array([f'T{t:02d}' for t in range(teams)])
+    catalogue = EVENT_CATALOGUE
+
+    swimmer = np.arange(teams * swimmers_per_team)
+    team = swimmer // swimmers_per_team
+    number = swimmer % swimmers_per_team
+    # FIRST_NAMES alternate girls' and boys' names
+    is_girl = number % 2 == 0
+    first_age = rng.integers(5, 19, len(swimmer))
+    ability = rng.lognormal(0, 0.12, len(swimmer))
+
+    results = {}
+    for season_index in range(seasons):
+        season = first_season + season_index
+        # swimmers who age out of 15-18 are replaced by a new 5 year old on the same roster spot
+        age = 5 + (first_age - 5 + season_index) % 14
+
+        # each swimmer's events, picked at random from the events open to their gender and age
+        swimmer_events = np.empty((len(swimmer), events_per_swimmer), dtype='int64')
+        for (girl, event_age), codes in eligible.items():
+            members = np.flatnonzero((is_girl == girl) & (age == event_age))
+            picks = np.argsort(rng.random((len(members), len(codes))), axis=1)[:, :events_per_swimmer]
+            swimmer_events[members] = codes[picks]
+
+        # each (swimmer, event) is swum at roughly 80% of the meets
+        swims = np.repeat(np.arange(swimmer_events.size), meets_per_season)
+        meet = np.tile(np.arange(meets_per_season), swimmer_events.size)
+        attended = rng.random(len(swims)) < 0.8
+        swims, meet = swims[attended], meet[attended]
+        swim_swimmer = swims // events_per_swimmer
+        event_code = swimmer_events.ravel()[swims]
+
+        # swimmers improve over the season
+        improvement = 1 - 0.01 * meet
+        hundredths = (_typical_hundredths(age[swim_swimmer], event_code) * ability[swim_swimmer] * improvement
+                      * rng.lognormal(0, 0.04, len(swims))).round().astype('int64')
+
+        meet_dates = pd.date_range(f'{season}-06-01', periods=meets_per_season, freq='W-SAT').strftime('%m/%d/%y')
+        results[season] = pd.DataFrame({
+            'first_name': np.array(FIRST_NAMES)[number[swim_swimmer] % len(FIRST_NAMES)],
+            'last_name': np.array(LAST_NAMES)[(number[swim_swimmer] // len(FIRST_NAMES)) % len(LAST_NAMES)],
+            'team_abbr': team_names[team[swim_swimmer]],
+            'age': age[swim_swimmer],
+            'age_group': catalogue['age_group'].to_numpy()[event_code],
+            'distance': catalogue['distance'].to_numpy()[event_code],
+            'stroke': catalogue['stroke'].to_numpy()[event_code],
+            'time': convert_hundredths_to_times(pd.Series(hundredths)).to_numpy(),
+            'converted_hundredths': hundredths,
+            'date': np.asarray(meet_dates)[meet],
+        })
+    return results
+
+
+# Function to build current standards from generated results: gold and silver at the given
+# percentiles of every event, rounded to the tenth of a second, with meter conversions
+def generate_standards(results, gold_pct=0.18, silver_pct=0.6):
+    events, sorted_values = sort_event_times(results)
+    thresholds = np.round(event_quantiles(events, sorted_values, [gold_pct, silver_pct]), -1)
+    standards = events[['age_group', 'distance', 'stroke']].copy()
+    for column, level in [('gold', 0), ('silver', 1)]:
+        values = pd.Series(thresholds[:, level])
+        standards[f'{column}_y'] = convert_hundredths_to_times(values)
+        standards[f'{column}_s'] = convert_hundredths_to_times(values * METERS_FACTOR)
+    return standards[['age_group', 'distance', 'stroke', 'gold_y', 'gold_s', 'silver_y', 'silver_s']]
+
+
+# Function to build every team's Swimtopia best times export from one season of results.
+# Returns a dict of team -> DataFrame with one row per swimmer per event.
+def generate_best_times(results):
+    best = results.loc[results.groupby(['team_abbr', 'first_name', 'last_name', 'age_group', 'distance', 'stroke'])
+                       ['converted_hundredths'].idxmin()]
+    converted = convert_hundredths_to_times(best['converted_hundredths']).to_numpy()
+    exports = pd.DataFrame({
+        'LastName': best['last_name'].to_numpy(),
+        'FirstName': best['first_name'].to_numpy(),
+        'AgeGroup': best['age_group'].to_numpy(),
+        'Event': (best['distance'].astype(str) + ' ' + best['stroke']).to_numpy(),
+        'Age': best['age'].to_numpy(),
+        'Date': best['date'].to_numpy(),
+        'SwimMeet': 'Dual Meet',
+        'Time': converted,
+        'ConvertedTime': converted,
+        'ConvertedHundredths': best['converted_hundredths'].to_numpy(),
+    })
+    teams = best['team_abbr'].to_numpy()
+    return {team: exports[teams == team].reset_index(drop=True) for team in np.unique(teams)}
+
+
+# Function to write a complete synthetic data set: gasl<season>.csv results, current_standards.csv
+# and best_times/<team>.csv exports for the latest season. Returns the number of result rows written.
+def write_league(output_dir, teams=30, seasons=3, swimmers_per_team=150, events_per_swimmer=4, meets_per_season=7, seed=0):
+    os.makedirs(os.path.join(output_dir, 'best_times'), exist_ok=True)
+    results = generate_results(teams, seasons, swimmers_per_team, events_per_swimmer, meets_per_season, seed=seed)
+    for season, season_results in results.items():
+        season_results.to_csv(os.path.join(output_dir, f'gasl{season}.csv'), index=False)
+
+    generate_standards(pd.concat(results.values(), ignore_index=True)).to_csv(
+        os.path.join(output_dir, 'current_standards.csv'), index=False)
+    for team, export in generate_best_times(results[max(results)]).items():
+        export.to_csv(os.path.join(output_dir, 'best_times', f'{team}.csv'), index=False)
+    return sum(len(season_results) for season_results in results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(__file__, description="Generate a synthetic league of results, standards and best times exports")
+
+    parser.add_argument("--output-dir", default='./synthetic', help="Directory to write the data set to (default: ./synthetic)")
+    parser.add_argument("--teams", type=int, default=30, help="Number of teams")
+    parser.add_argument("--seasons", type=int, default=3, help="Number of seasons")
+    parser.add_argument("--swimmers", type=int, default=150, help="Swimmers per team")
+    parser.add_argument("--events", type=int, default=4, help="Events each swimmer swims")
+    parser.add_argument("--meets", type=int, default=7, help="Meets per season")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    options = parser.parse_args()
+
+    rows = write_league(options.output_dir, options.teams, options.seasons, options.swimmers, options.events, options.meets, options.seed)
+    print(f'{rows} results written to {options.output_dir}')
+
+# Main execution
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import pandas as pd
+import numpy as np
 import glob
 from datetime import datetime
 import math
+import hashlib
+import os
+from constants import ATHLETE_KEY_COLUMNS, RESULTS_SCHEMA
+from events import event_names
 
 
 # Function to read CSV files and concatenate them into a single DataFrame
@@ -14,56 +19,158 @@ def read_csv_files(file_path_pattern):
     return combined_df
 
 
+# Function to read one gasl results CSV with the fixed results schema (only the needed columns).
+# With chunksize set, returns an iterator of DataFrames of at most that many rows.
+def read_results_csv(file, chunksize=None):
+    return pd.read_csv(file, usecols=list(RESULTS_SCHEMA), dtype=RESULTS_SCHEMA, chunksize=chunksize)
+
+
+# Matches "MM:SS.hh" and "SS.hh" swim times (the hundredths are optional)
+TIME_PATTERN = r'^(?:(\d+):)?(\d+)(?:\.(\d{1,2}))?$'
+
+
+# Function to convert a whole column of MM:SS.hh / SS.hh strings to hundredths of a second.
+# Returns the hundredths as an int64 Series plus a boolean Series flagging malformed values.
+# Missing or blank values convert to 0 without being flagged, malformed values convert to 0.
+def convert_times_to_hundredths(times):
+    times = pd.Series(times, copy=False)
+    # swim times repeat heavily, so parse each distinct value once and broadcast back
+    codes, uniques = pd.factorize(times.astype(str).str.strip(), use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=object)
+    parts = uniques.str.extract(TIME_PATTERN)
+    minutes = pd.to_numeric(parts[0]).fillna(0)
+    seconds = pd.to_numeric(parts[1]).fillna(0)
+    fraction = pd.to_numeric(parts[2].fillna('0').str.ljust(2, '0'))
+    parsed = (minutes * 6000 + seconds * 100 + fraction).fillna(0).astype('int64').to_numpy()
+    bad = parts[1].isna().to_numpy()
+
+    missing = times.isna().to_numpy() | (uniques.to_numpy()[codes] == '')
+    malformed = bad[codes] & ~missing
+    hundredths = np.where(missing | malformed, 0, parsed[codes])
+    return (pd.Series(hundredths, index=times.index, dtype='int64'),
+            pd.Series(malformed, index=times.index, dtype=bool))
+
+
+# Function to convert a whole column of hundredths of a second to MM:SS.hh format
+# (HH:M:SS once the value reaches an hour). With deficits_only set, only negative values are
+# formatted and everything else becomes an empty string. Missing values become empty strings.
+def convert_hundredths_to_times(hundredths, deficits_only=False):
+    hundredths = pd.Series(hundredths, copy=False)
+    missing = hundredths.isna().to_numpy()
+    values = pd.to_numeric(hundredths).fillna(0).to_numpy(dtype='float64')
+    negative = values < 0
+    total = np.floor(np.abs(values)).astype('int64')
+
+    minutes = total // 6000
+    hours = minutes // 60
+    seconds = (total // 100) % 60
+    fraction = total % 100
+
+    def _padded(values):
+        return pd.Series(values).astype(str).str.zfill(2)
+
+    short_form = _padded(minutes) + ':' + _padded(seconds) + '.' + _padded(fraction)
+    long_form = _padded(hours) + ':' + pd.Series(minutes % 60).astype(str) + ':' + _padded(seconds)
+    formatted = np.where(hours > 0, long_form, short_form)
+    formatted = np.where(negative, '-' + formatted.astype(object), formatted)
+
+    blank = missing | (~negative if deficits_only else False)
+    formatted = np.where(blank, '', formatted)
+    return pd.Series(formatted, index=hundredths.index, dtype=object)
+
+
+# Print the distinct malformed times found in a column, if any
+def report_malformed_times(label, times, malformed):
+    if malformed.any():
+        bad_values = pd.Series(times, copy=False)[malformed].unique()
+        print(f'Skipping {malformed.sum()} malformed time(s) in {label}: {", ".join(map(str, bad_values))}')
+
+
 # Function to convert hundredths of a second to MM:SS.hh format
 def convert_hundredths_to_time(hundredths):
-    negative = False
-    if hundredths < 0:
-        negative = True
-        hundredths = abs(hundredths)
-    total_seconds = hundredths / 100.0
-    minutes = int(total_seconds // 60)
-    hours = int(minutes // 60)
-    seconds = int(total_seconds % 60)
-    hundredths = int((total_seconds - minutes * 60 - seconds) * 100)
-    if hours > 0:
-        if negative:
-            return f"-{hours:02}:{int(minutes % 60)}:{seconds:02}"
-        else:
-            return f"{hours:02}:{int(minutes % 60)}:{seconds:02}"
-    else:
-        if negative:
-            return f"-{minutes:02}:{seconds:02}.{hundredths:02}"
-        else:
-            return f"{minutes:02}:{seconds:02}.{hundredths:02}"
+    return convert_hundredths_to_times([hundredths]).iloc[0]
 
 
+# Function to convert a single MM:SS.hh / SS.hh string to hundredths of a second
 def convert_time_to_hundredths(time):
-    if not isinstance(time, str):
-        return 0
-    if ":" not in time:
-        time = f'00:{time}'
-    minutes = int(time.split(":")[0])
-    seconds_with_hundredths = time.split(":")[1]
-    
-    try:
-        seconds = int(int(seconds_with_hundredths.split('.')[0]) + (minutes * 60))
-    except:
-        print(time)
-    hundredths = int(seconds_with_hundredths.split('.')[1])
-    
-    total_hundredths = int((hundredths + (seconds * 100)))
-    return total_hundredths
-
-
-# Generate standardized event names from age group, distance, and stroke
-def create_event_name(age_group, distance, stroke):
-    return f"{age_group}_{distance}_{stroke}"
-
-
-# Add event names to a dataframe with age_group, distance, and stroke columns
+    hundredths, _ = convert_times_to_hundredths(pd.Series([time], dtype=object))
+    return int(hundredths.iloc[0])
+
+
+# Function to type a raw results DataFrame once: swim times as int32 hundredths, an 'Event_name'
+# column, and every text column (team, event, names, dates) as a categorical.
+# Rows without a time are dropped since they cannot count toward any standard.
+def prepare_results(df):
+    if not pd.api.types.is_numeric_dtype(df['converted_hundredths']):
+        hundredths, malformed = convert_times_to_hundredths(df['converted_hundredths'])
+        report_malformed_times('converted_hundredths', df['converted_hundredths'], malformed)
+        df['converted_hundredths'] = hundredths.where(~malformed & df['converted_hundredths'].notna())
+    df = df[df['converted_hundredths'].notna()].reset_index(drop=True)
+    df['converted_hundredths'] = df['converted_hundredths'].astype('int32')
+
+    df = add_event_names_column(df)
+    for column in df.columns:
+        if pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype('category')
+    return df
+
+
+# Function to concatenate DataFrames once, keeping categorical columns categorical
+# by giving every frame the union of their categories first. Empty frames (such as a results
+# file with only a header row) are left out, since their categories have no dtype to agree on.
+def concat_frames(frames):
+    frames = list(frames)
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if frames:
+        for column in frames[0].columns:
+            if all(isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames if column in frame):
+                categories = pd.api.types.union_categoricals(
+                    [pd.Categorical([], categories=frame[column].cat.categories) for frame in frames if column in frame]
+                ).categories
+                frames = [
+                    frame.assign(**{column: frame[column].cat.set_categories(categories)}) if column in frame else frame
+                    for frame in frames
+                ]
+    return pd.concat(frames, ignore_index=True)
+
+
+# Function to get the season (year) of every MM/DD/YY date in a column
+def get_seasons(dates):
+    codes, uniques = pd.factorize(pd.Series(dates, copy=False).astype(str))
+    years = pd.to_datetime(pd.Series(uniques), format='%m/%d/%y').dt.year.to_numpy(dtype='int16')
+    return pd.Series(years[codes], index=pd.Series(dates, copy=False).index)
+
+
+# Build the athlete identity index for a results DataFrame in one vectorized step.
+# Returns the dense int32 athlete id of every row plus a table of distinct athletes whose
+# position is the id.
+def build_athlete_index(df):
+    keys = df[ATHLETE_KEY_COLUMNS]
+    codes = keys.groupby(ATHLETE_KEY_COLUMNS, sort=False, dropna=False, observed=True).ngroup().to_numpy(dtype='int32')
+    athletes = keys[~pd.Series(codes).duplicated().to_numpy()].reset_index(drop=True)
+    athletes.index.name = 'athlete_id'
+    return codes, athletes
+
+
+# Add an int32 'athlete_id' column to a results DataFrame
+def add_athlete_ids(df):
+    codes, _ = build_athlete_index(df)
+    df['athlete_id'] = codes
+    return df
+
+
+# Add the categorical event name (see events.py) to a dataframe with age_group, distance, and stroke columns
 def add_event_names_column(df):
-    df['Event_name'] = df.apply(
-        lambda row: create_event_name(row['age_group'], row['distance'], row['stroke']), 
-        axis=1
-    )
-    return df
\ No newline at end of file
+    df['Event_name'] = event_names(df['age_group'], df['distance'], df['stroke'])
+    return df
+
+
+# Content hash of a file, or None when it does not exist
+def file_hash(path):
+    if not path or not os.path.exists(path):
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()